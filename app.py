@@ -1,35 +1,181 @@
 """
 Mental Health Support Chatbot - AI-Powered Flask Backend
-RAG (Retrieval-Augmented Generation): each reply augments the system prompt with matching
+RAG (Retrieval-Augmented Generation): each reply adds a context message with matching
 snippets from data/rag_knowledge.json for more accurate, grounded answers (see rag.py).
 Crisis detection remains rule-based. Optional mood analytics (see mood_store.py, ETHICS_AND_PRIVACY.md).
 """
 
+import hashlib
+import hmac
 import os
 
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-except ImportError:
-    pass  # python-dotenv optional
+# Only local runs ship a .env; on Render/Railway the environment is already set.
+_ENV_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
+if os.path.isfile(_ENV_FILE):
+    try:
+        from dotenv import load_dotenv
+        load_dotenv(_ENV_FILE)
+    except ImportError:
+        pass  # python-dotenv optional
 
-import copy
 import re
-import uuid
-from flask import Flask, render_template, request, jsonify
-
+import secrets
+import threading
+import time
+from collections import defaultdict, deque
+from collections.abc import Generator, Iterator
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+
+import httpx
+import orjson
+from cachetools import TTLCache
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+from flask import Flask, Response, render_template, request, jsonify
+from flask.json.provider import JSONProvider
+
+from batch import MAX_BATCH_PROMPTS, batch_result, submit_batch
 from coping import merge_face_and_text_suggestions
 from emotion_service import build_emotion_instruction, classify_face_image, classify_text_emotion
 from mood_store import analytics_summary, detect_mood_pattern, record_event
-from rag import augment_system_prompt
+from rag import rag_context
+import semantic_cache
+
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson, so jsonify() and request.get_json() use its C codec."""
+
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS),
+            mimetype="application/json",
+        )
+
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.secret_key = os.environ.get("FLASK_SECRET_KEY", "dev-secret-change-in-production")
 app.config["MAX_CONTENT_LENGTH"] = int(os.environ.get("MAX_UPLOAD_MB", "8")) * 1024 * 1024
 
-# In-memory conversation history (session_id -> list of messages)
+# In-memory conversation history (session_id -> session record, see _new_session)
 # Cleared on server restart. No persistent storage.
-conversations: dict[str, list[dict]] = {}
+# Bounded: least-recently-written sessions are evicted at SESSION_CACHE_MAX, idle ones after SESSION_TTL seconds.
+conversations: TTLCache = TTLCache(
+    maxsize=int(os.environ.get("SESSION_CACHE_MAX", "10000")),
+    ttl=int(os.environ.get("SESSION_TTL", "3600")),
+)
+# TTLCache is not thread-safe; guard every read/write (gunicorn runs threaded workers).
+_conversations_lock = threading.RLock()
+
+# Shared outbound HTTP client for all LLM providers (created on first use, see _http_client).
+# Reusing one pool keeps TCP/TLS connections alive between turns instead of reconnecting.
+_HTTP: httpx.Client | None = None
+_HTTP_LOCK = threading.Lock()
+# HTTP/2 (httpx[http2]) lets concurrent sessions share one multiplexed connection per provider
+# host; without the h2 package the client stays on HTTP/1.1.
+try:
+    import h2  # noqa: F401
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+# Per-provider read budget (connect is 3s): a cloud provider that has not answered in time is
+# given up on (not retried) so the race moves on to the next one. The local LLM keeps the
+# client default of 25s, since a local model may need to load first.
+_PROVIDER_TIMEOUTS = {
+    name: httpx.Timeout(float(os.environ.get(env, default)), connect=3.0)
+    for name, env, default in (
+        ("gemini", "GEMINI_TIMEOUT", "6"),
+        ("groq", "GROQ_TIMEOUT", "4"),
+        ("openai", "OPENAI_TIMEOUT", "8"),
+    )
+}
+
+# Hedged cloud calls: if a provider has not answered within its hedge delay, the next one is
+# started in parallel and the first successful reply wins.
+HEDGE_DELAY_SECS = float(os.environ.get("LLM_HEDGE_DELAY", "1.5"))
+# Overall budget for the race: past it the user gets the offline fallback and stragglers are
+# left to finish (and be discarded) in the pool
+RESPONSE_DEADLINE_SECS = float(os.environ.get("LLM_RESPONSE_DEADLINE", "30"))
+_PROVIDER_POOL = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("LLM_POOL_WORKERS", "32")),
+    thread_name_prefix="llm",
+)
+# Recent successful latencies (seconds) per provider, used to adapt the hedge delay
+_provider_latency: dict[str, deque] = defaultdict(lambda: deque(maxlen=50))
+# Provider health: EWMA of each provider's failure rate. Past _CIRCUIT_ERROR_RATE its circuit
+# opens and it is tried after the healthy ones for _CIRCUIT_OPEN_SECS; then it gets its place
+# back and the next result decides whether the circuit reopens.
+_ERROR_EWMA_ALPHA = 0.1
+_CIRCUIT_ERROR_RATE = 0.5
+_CIRCUIT_OPEN_SECS = 30.0
+_provider_errors: dict[str, float] = defaultdict(float)
+_circuit_open_until: dict[str, float] = defaultdict(float)
+
+# Exact-match reply cache, shared across sessions: a turn whose provider input (system prompt,
+# summary, turns and this turn's RAG/emotion context) matches an earlier one reuses that reply.
+# RESPONSE_CACHE_TTL_SECS=0 disables it.
+RESPONSE_CACHE_TTL_SECS = int(os.environ.get("RESPONSE_CACHE_TTL_SECS", "3600"))
+_response_cache: TTLCache = TTLCache(
+    maxsize=int(os.environ.get("RESPONSE_CACHE_MAX", "1000")),
+    ttl=max(RESPONSE_CACHE_TTL_SECS, 1),
+)
+_response_cache_lock = threading.Lock()
+# Replies to these depend on when they are asked, so they are never cached
+_TIME_SENSITIVE_RE = re.compile(
+    r"\b(?:now|today|tonight|tomorrow|yesterday|this\s+(?:morning|afternoon|evening|week|weekend))\b"
+)
+
+OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
+GROQ_CHAT_URL = "https://api.groq.com/openai/v1/chat/completions"
+GEMINI_GENERATE_URL = "https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
+GEMINI_STREAM_URL = "https://generativelanguage.googleapis.com/v1beta/models/{model}:streamGenerateContent?alt=sse"
+
+# Provider credentials and models, read once at import (after .env is loaded) rather than on
+# every turn; restart the app to pick up changes
+LOCAL_LLM_URL = os.environ.get("LOCAL_LLM_URL", "").strip()
+LOCAL_LLM_MODEL = os.environ.get("LOCAL_LLM_MODEL", "llama3.2")
+LOCAL_LLM_API_KEY = os.environ.get("LOCAL_LLM_API_KEY", "ollama")
+GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
+GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-1.5-flash")
+GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
+GROQ_MODEL = os.environ.get("GROQ_MODEL", "llama-3.3-70b-versatile")
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
+OPENAI_MODEL = os.environ.get("OPENAI_MODEL", "gpt-4o-mini")
+AI_CONFIGURED = bool(LOCAL_LLM_URL or GEMINI_API_KEY or GROQ_API_KEY or OPENAI_API_KEY)
+
+# History compaction: the last MAX_TAIL_MESSAGES turns are kept verbatim; older ones (and, once the
+# history nears the context budget, all but the last few) are folded into one summary message.
+# Only the tail and summary are sent, so this also caps the input tokens of every provider call.
+MAX_TAIL_MESSAGES = max(1, 2 * int(os.environ.get("LLM_HISTORY_TURNS", "6")))
+CONTEXT_TOKENS = int(os.environ.get("LLM_CONTEXT_TOKENS", "8000"))
+_KEEP_RECENT_MESSAGES = 6
+_SUMMARY_PREFIX = "Prior conversation summary: "
+_SUMMARY_MAX_CHARS = 1500
+# Every _CONDENSE_EVERY folded messages, the heuristic summary is rewritten by an LLM in the
+# background (LLM_SUMMARIES=false to disable); see _condense_summary
+_CONDENSE_EVERY = 8
+_CONDENSE_PROMPT = (
+    "Condense this running summary of a supportive chat into at most three sentences. Keep what "
+    "the user shared about their situation and feelings, and any advice already given. "
+    "Write in the third person with no preamble."
+)
+# Separate from _PROVIDER_POOL: condense jobs wait on session locks, and must never starve the
+# provider calls that the lock holders are waiting for
+_SUMMARY_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="summary")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+
+# User messages (case-folded) the offline fallback looks back over
+RECENT_USER_MESSAGES = 5
+# A repeat of the message just answered, arriving within this many seconds of the reply (double
+# submit, client retry), gets that reply again instead of a second provider call
+_DUPLICATE_WINDOW_SECS = 5.0
 
 
 def _mood_tracking_enabled() -> bool:
@@ -90,720 +236,1505 @@ When "Retrieved reference knowledge" appears in your instructions, use it to gro
 Never: generic "Thank you for sharing" without addressing their specific situation. Always: reference what they said, give relevant advice."""
 
 
-def is_crisis_message(text: str) -> bool:
-    """Check if message contains crisis keywords (including typos / obfuscated spellings)."""
-    msg_lower = text.lower().strip()
-    # "can't go on" (crisis) but not "can't go on holiday / vacation"
-    if re.search(
-        r"\b(can't|cant|cannot)\s+go\s+on\b(?!\s+(holiday|vacation|honeymoon|tour))",
-        msg_lower,
-    ):
+GREETING_TEXT = (
+    "Hello. I'm here to listen and support you. You can share how you're feeling—whether it's stress, "
+    "anxiety, sadness, or anything else. How are you doing today?"
+)
+
+
+def _trie_pattern(words) -> str:
+    """
+    Regex alternation factored on shared prefixes ("suicid(?:al|e)"), so at each position the
+    engine walks one trie-shaped branch instead of retrying every keyword from its first letter.
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+# Compiled once at import: each check is a single pass of the C regex engine over the
+# (already case-folded) message
+_CRISIS_RE = re.compile(_trie_pattern(CRISIS_KEYWORDS))
+# "can't go on" (crisis) but not "can't go on holiday / vacation". Leads with the literal
+# "can" (word boundary checked by the lookbehind) so the engine can skip ahead to candidates.
+_CANT_GO_ON_RE = re.compile(
+    r"can(?<=\bcan)(?:'t|t|not)\s+go\s+on\b(?!\s+(?:holiday|vacation|honeymoon|tour))"
+)
+_NON_LETTERS_RE = re.compile(r"[^a-z]")
+_CRISIS_LETTER_WORDS = ["suicide", "suicid", "sucide", "sucid", "sudcide", "killmyself", "endmylife"]
+_CRISIS_LETTERS_RE = re.compile(_trie_pattern(_CRISIS_LETTER_WORDS))
+_OVERDOSE_DRUG_RE = re.compile(_trie_pattern(["medicine", "pills"]))
+_OVERDOSE_QTY_RE = re.compile(_trie_pattern(["100", "all", "many"]))
+# Nothing shorter can match any of the above ("can't go on" and the overdose pairs are longer
+# still), so "hi", "ok", "yes" skip the scans entirely
+_CRISIS_MIN_LEN = min(len(k) for k in (*CRISIS_KEYWORDS, *_CRISIS_LETTER_WORDS))
+
+
+def is_crisis_message(text: str, msg_lower: str | None = None) -> bool:
+    """
+    Check if message contains crisis keywords (including typos / obfuscated spellings).
+    Pass msg_lower (text.casefold()) when the caller already has it.
+    """
+    if msg_lower is None:
+        msg_lower = text.casefold()
+    if len(msg_lower) < _CRISIS_MIN_LEN:
+        return False
+    if _CANT_GO_ON_RE.search(msg_lower):
         return True
-    if any(kw in msg_lower for kw in CRISIS_KEYWORDS):
+    if _CRISIS_RE.search(msg_lower):
         return True
     # Letters-only string catches "sud=cide", "su!cide", spacing tricks
-    letters_only = re.sub(r"[^a-z]", "", msg_lower)
-    if any(
-        s in letters_only
-        for s in ("suicide", "suicid", "sucide", "sucid", "sudcide", "killmyself", "endmylife")
-    ):
+    letters_only = _NON_LETTERS_RE.sub("", msg_lower)
+    if _CRISIS_LETTERS_RE.search(letters_only):
         return True
     # Overdose: "100" or "all" + medicine/pills
-    if ("medicine" in msg_lower or "medicines" in msg_lower or "pills" in msg_lower) and ("100" in msg_lower or "all" in msg_lower or "many" in msg_lower):
+    if _OVERDOSE_DRUG_RE.search(msg_lower) and _OVERDOSE_QTY_RE.search(msg_lower):
         return True
     return False
 
 
-def get_crisis_response() -> tuple[str, bool]:
-    """Return emergency resources (UK). Second value indicates is_crisis."""
-    return (
-        "I'm really concerned about what you're sharing. "
-        "Please reach out for immediate support:\n\n"
-        "• Samaritans: 116 123 (24/7, free)\n"
-        "• Shout: Text SHOUT to 85258 (24/7, free)\n"
-        "• Papyrus HopelineUK: 0800 068 4141 (under 35, 9am–midnight)\n"
-        "• CALM: 0800 58 58 58 (5pm–midnight)\n"
-        "• Mind: 0300 123 3393 (Mon–Fri 9am–6pm)\n"
-        "• Emergency: 999 or NHS 111\n\n"
-        "You don't have to face this alone. These services are free and confidential.",
-        True,
-    )
+CRISIS_RESPONSE_TEXT = (
+    "I'm really concerned about what you're sharing. "
+    "Please reach out for immediate support:\n\n"
+    "• Samaritans: 116 123 (24/7, free)\n"
+    "• Shout: Text SHOUT to 85258 (24/7, free)\n"
+    "• Papyrus HopelineUK: 0800 068 4141 (under 35, 9am–midnight)\n"
+    "• CALM: 0800 58 58 58 (5pm–midnight)\n"
+    "• Mind: 0300 123 3393 (Mon–Fri 9am–6pm)\n"
+    "• Emergency: 999 or NHS 111\n\n"
+    "You don't have to face this alone. These services are free and confidential."
+)
+
+
+# Static parts of /chat JSON bodies, encoded once at import. Only session_id
+# (and, for crisis replies, the per-message emotion fields) are encoded per request.
+_CRISIS_JSON_PREFIX = b'{"response":' + orjson.dumps(CRISIS_RESPONSE_TEXT) + b',"is_crisis":true,'
+_EMPTY_MESSAGE_JSON = orjson.dumps({
+    "response": "Please type a message.",
+    "is_crisis": False,
+    "session_id": "__SESSION_ID__",
+    "emotion": None,
+    "face_emotion": None,
+    "coping_suggestions": [],
+    "mood_pattern_note": None,
+})
+
+
+def _json_response(body: bytes):
+    return app.response_class(body, mimetype="application/json")
+
+
+def _with_turn_context(history: list, gemini_contents: list, emotion_instruction: str = "") -> tuple[list, list]:
+    """
+    Copies of this turn's history and Gemini contents with the RAG snippets and emotion hints
+    placed just before the user's message. Kept out of the system prompt so the system prompt,
+    summary and earlier turns stay byte-identical from turn to turn, and provider prompt caches
+    (OpenAI / Groq prefix caching, Gemini implicit caching) can reuse that prefix.
+    """
+    last_user = history[-1]["content"] if history[-1].get("role") == "user" else ""
+    blocks = [rag_context(last_user)]
+    if emotion_instruction.strip():
+        blocks.append(
+            "Emotion & multimodal context (tone hints only—not a diagnosis):\n" + emotion_instruction.strip()
+        )
+    context = "\n\n".join(b for b in blocks if b)
+    if not context:
+        return history, gemini_contents
+    # Stored message dicts are never mutated: the user turn is rebuilt for Gemini
+    h = [*history[:-1], {"role": "system", "content": context}, history[-1]]
+    g = [*gemini_contents[:-1], {"role": "user", "parts": [{"text": context}, *gemini_contents[-1]["parts"]]}]
+    return h, g
+
+
+def _approx_tokens(m: dict) -> int:
+    """Rough token estimate (~4 characters per token)."""
+    return (len(m["content"]) + len(m["role"])) // 4
+
+
+def _summarize_messages(messages: list[dict]) -> str:
+    """Heuristic summary (no LLM call): first sentence of each turn, oldest dropped past the cap."""
+    parts: list[str] = []
+    for m in messages:
+        content = m["content"].strip()
+        if m["role"] == "system" and content.startswith(_SUMMARY_PREFIX):
+            parts.extend(content[len(_SUMMARY_PREFIX):].split(" | "))
+            continue
+        first = _SENTENCE_END_RE.split(content, 1)[0][:200]
+        who = "User" if m["role"] == "user" else "Assistant"
+        parts.append(f"{who}: {first}")
+    while len(parts) > 1 and sum(len(p) + 3 for p in parts) > _SUMMARY_MAX_CHARS:
+        parts.pop(0)
+    return " | ".join(parts)
+
+
+def _gemini_content(message: dict) -> dict:
+    """One stored message in Gemini `contents` form (roles are user/model)."""
+    role = "user" if message["role"] == "user" else "model"
+    return {"role": role, "parts": [{"text": message["content"]}]}
+
+
+# Shared by every session record and never mutated (_with_turn_context adds per-turn context
+# as separate messages)
+_SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
+_GREETING_MESSAGE = {"role": "assistant", "content": GREETING_TEXT}
+_GEMINI_GREETING = _gemini_content(_GREETING_MESSAGE)
+
+
+def _new_session() -> dict:
+    """
+    Session record: fixed system message, optional rolling summary, bounded recent turns.
+    Gemini-format copies of the turns are kept alongside (converted once, on append) so each
+    Gemini call reuses them instead of re-mapping the whole history. The tail starts with the
+    greeting or a user message, so turns always alternate.
+    """
+    return {
+        "system": _SYSTEM_MESSAGE,
+        "summary": None,
+        "tail": deque([_GREETING_MESSAGE], maxlen=MAX_TAIL_MESSAGES),
+        "gemini_tail": deque([_GEMINI_GREETING], maxlen=MAX_TAIL_MESSAGES),
+        # Messages folded in since the summary was last condensed, and whether a condense is running
+        "folded": 0,
+        "condensing": False,
+        # Case-folded copies of the last few user messages, kept so fallback context needs no
+        # re-scan or re-lowering of the history (provider payloads never see them)
+        "recent_user": deque(maxlen=RECENT_USER_MESSAGES),
+        # (case-folded user message, reply, monotonic time) of the last completed turn
+        "last_turn": None,
+        # Held for a whole turn so concurrent requests on one session (double-submit, client
+        # retry) run one after another; expires with the record.
+        "lock": threading.Lock(),
+    }
 
 
-def _history_with_rag(history: list, emotion_instruction: str = "") -> list:
-    """Copy history with RAG- and emotion-augmented system message for this turn."""
-    h = copy.deepcopy(history)
-    if h and h[0].get("role") == "system":
-        last_user = h[-1]["content"] if h[-1].get("role") == "user" else ""
-        sys_content = augment_system_prompt(SYSTEM_PROMPT, last_user)
-        if emotion_instruction.strip():
-            sys_content += (
-                "\n\n---\nEmotion & multimodal context (tone hints only—not a diagnosis):\n"
-                + emotion_instruction.strip()
-            )
-        h[0] = {"role": "system", "content": sys_content}
-    return h
+def _session_history(sess: dict) -> list:
+    """Provider-format message list: system, summary (if any), then recent turns."""
+    head = [sess["system"]] if sess["summary"] is None else [sess["system"], sess["summary"]]
+    return [*head, *sess["tail"]]
+
+
+def _session_gemini_contents(sess: dict) -> list:
+    """
+    Same turns as _session_history in Gemini `contents` form. The system message and summary are
+    not turns: _gemini_payload sends them as systemInstruction.
+    """
+    return list(sess["gemini_tail"])
+
+
+def _fold_into_summary(sess: dict, messages: list[dict]) -> None:
+    old = [sess["summary"], *messages] if sess["summary"] else messages
+    _set_summary(sess, _summarize_messages(old))
+    sess["folded"] += len(messages)
+
+
+def _set_summary(sess: dict, text: str) -> None:
+    sess["summary"] = {"role": "system", "content": _SUMMARY_PREFIX + text}
+
+
+def _fold_oldest(sess: dict, count: int) -> None:
+    """
+    Fold the oldest `count` tail messages into the summary, plus any assistant reply that would
+    then lead the tail without its user message, so the tail still starts with a user turn.
+    """
+    tail, gemini_tail = sess["tail"], sess["gemini_tail"]
+    old = []
+    while tail and (len(old) < count or tail[0]["role"] != "user"):
+        old.append(tail.popleft())
+        gemini_tail.popleft()
+    if old:
+        _fold_into_summary(sess, old)
+
+
+def _append_message(sess: dict, message: dict) -> None:
+    """Append to the tail; messages pushed out of the full deque are folded into the summary."""
+    if len(sess["tail"]) == sess["tail"].maxlen:
+        _fold_oldest(sess, 1)
+    sess["tail"].append(message)
+    sess["gemini_tail"].append(_gemini_content(message))
 
 
-def _get_recent_user_messages(history: list) -> list[str]:
-    """Extract recent user messages from conversation for context."""
-    return [m["content"].lower() for m in history if m.get("role") == "user"][-5:]
+def _compact_session(sess: dict) -> None:
+    """Once the history nears the token budget, fold all but the most recent turns into the summary."""
+    if sum(_approx_tokens(m) for m in _session_history(sess)) <= 0.8 * CONTEXT_TOKENS:
+        return
+    count = len(sess["tail"]) - _KEEP_RECENT_MESSAGES
+    if count > 0:
+        _fold_oldest(sess, count)
+
+
+def _get_recent_user_messages(sess: dict) -> list[str]:
+    """Recent user messages (case-folded, oldest first) for fallback context."""
+    return list(sess["recent_user"])
+
+
+# Whole-message greetings: "hi", "hello there!", "good morning". Anchored and made only of
+# greeting words, so "Hi I am sad" (or any feelings word) can never match.
+_GREETING_ONLY_RE = re.compile(
+    r"(?:(?:hi|hello|hey)(?:\s+(?:there|again))?\s*[!?.]*|good\s+(?:morning|afternoon|evening)[\s!?.]*)"
+)
 
 
 def _is_greeting_only(user_message: str) -> bool:
     """True only for short standalone greetings—not 'Hi I am sad'."""
     s = user_message.strip().lower()
-    if len(s) > 80:
-        return False
-    # Must not look like a full sentence about feelings
-    if any(w in s for w in ["sad", "hurt", "hate", "feel", "anxious", "depress", "suic", "kill", "die", "ugly", "alone", "stress"]):
-        return False
-    return bool(
-        re.match(r"^(hi|hello|hey)\s*[!?.]*$", s)
-        or re.match(r"^(good\s+(morning|afternoon|evening))[\s!?.]*$", s)
-        or re.match(r"^(hi|hello|hey)\s+(there|again)\s*[!?.]*$", s)
-    )
-
+    return len(s) <= 80 and _GREETING_ONLY_RE.fullmatch(s) is not None
+
+
+# Canned replies by category (see _classify_fallback)
+_FALLBACK_RESPONSES: dict[str, str] = {
+    "self_hatred": (
+        "I'm really sorry you're hurting this much. What you're feeling is heavy—and it doesn't mean you're a bad person. "
+        "Many people have moments of intense self-criticism; it can be linked to depression or past hurt. "
+        "You deserve support: talking to Samaritans (116 123), your GP, or a therapist can help. "
+        "Right now: try naming one small thing that isn't terrible about today, even if it feels tiny. "
+        "I'm here with you. You matter."
+    ),
+    "disgust": (
+        "Feeling disgusting or repelled by yourself is painful—and it's a feeling, not the truth about who you are. "
+        "Your worth isn't defined by how you feel in your worst moments. "
+        "If body image is part of this, remember many people struggle; Beat and Mind have resources. "
+        "Would you like to say more about what's behind this feeling? I'm listening."
+    ),
+    "hate_everyone": (
+        "Feeling like you hate everyone can come from hurt, burnout, or feeling let down again and again. "
+        "Your anger makes sense if you've been wounded. It doesn't make you a bad person. "
+        "Sometimes talking to a therapist helps unpack where this is coming from. "
+        "Is there one situation or person that started this feeling? I'm here to listen."
+    ),
+    "advice_breakup": (
+        "I hear you—getting over a breakup, especially when there's been cheating, is really hard. Here are some steps that help:\n\n"
+        "1. **Allow yourself to feel** – Anger, sadness, and hurt are valid. Don't rush to 'get over it'.\n"
+        "2. **Limit contact** – Unfollow, mute, or block if it helps. Out of sight can help with healing.\n"
+        "3. **Lean on people** – Talk to a friend or family member. You don't have to do this alone.\n"
+        "4. **Focus on you** – One small thing you enjoy: a walk, a film, a hobby you've neglected.\n"
+        "5. **Time** – Healing isn't linear. Some days will be harder. That's okay.\n\n"
+        "You deserve someone who chooses you. His actions say nothing about your worth. "
+        "Relate (relate.org.uk) offers relationship counselling in the UK. Would you like to talk more?"
+    ),
+    "advice_trust": (
+        "Based on what you've shared about trust—it's understandable if you've been hurt before. "
+        "**Steps that help:** Start with one small step—share something small with someone you feel safest with. "
+        "You don't have to trust everyone. A therapist can help you work through this in a safe space. "
+        "Mind (mind.org.uk) has resources: 0300 123 3393. What feels like the hardest part right now?"
+    ),
+    "advice_disconnected": (
+        "Feeling disconnected doesn't mean something is wrong with you. "
+        "**What might help:** Be gentle with yourself. Try one small social step—even a short chat with someone. "
+        "Talking to a therapist can help you understand what's going on. "
+        "You don't have to figure it all out today. What would feel manageable right now?"
+    ),
+    "advice_low": (
+        "When you're feeling low, small steps matter:\n\n"
+        "1. **Reach out** – Text one person. You don't have to explain everything.\n"
+        "2. **Get outside** – Even 10 minutes of fresh air can help.\n"
+        "3. **Routine** – One small thing at the same time each day (e.g. morning stretch).\n"
+        "4. **Talk to a GP** – If this has lasted weeks, they can help or refer you.\n\n"
+        "Samaritans (116 123) are there 24/7 if you need to talk. You're not alone."
+    ),
+    "advice_stress": (
+        "When small things add to our stress: (1) Take a breath. (2) Can you fix it, borrow something, or find an alternative? "
+        "(3) Remember—a dress is just a thing. You matter more. What's one small step you can take right now?"
+    ),
+    "advice": (
+        "Here's what might help: take one small step at a time. Be gentle with yourself. "
+        "Talking to someone you trust—a friend, family member, or therapist—can make a big difference. "
+        "If you'd like to share what's going on, I can give more specific advice. What feels most doable for you right now?"
+    ),
+    "trust": (
+        "Not being able to trust people can feel really lonely and isolating. "
+        "It's understandable if you've been hurt before—that can make it hard to open up. "
+        "Trust can be built slowly, one small step at a time. You don't have to trust everyone. "
+        "Would you like to talk about what happened? I'm here, and I'm not going anywhere. "
+        "A therapist can also help you work through this in a safe way."
+    ),
+    "disconnected": (
+        "Feeling disconnected from people can be confusing and lonely. "
+        "It doesn't mean something is wrong with you—sometimes we go through phases, or we need time to heal. "
+        "It could be depression, past hurt, or just needing a break. You don't have to have it all figured out. "
+        "Talking to a therapist can help you understand what's going on. "
+        "For now: be kind to yourself. You're not broken. Would you like to talk more about what you're feeling?"
+    ),
+    "broke_clothes": (
+        "I'm sorry your dress broke—that's frustrating, especially if it mattered to you or you had plans. "
+        "It's okay to feel upset. These things happen. Can you fix it, borrow something, or find an alternative? "
+        "And remember—a dress doesn't define you. You're more than what you wear. "
+        "How are you holding up? Is there something else adding to the stress?"
+    ),
+    "broke": (
+        "I'm sorry that happened—it's frustrating when things break. "
+        "It's okay to feel upset. Can you fix it or find a workaround? "
+        "Sometimes small things feel big when we're already stressed. How are you doing?"
+    ),
+    "guilt": (
+        "Feeling guilty doesn't make you a bad person—it means you care. Everyone makes mistakes. "
+        "What matters is that you're trying to be better. You're not defined by one moment or one choice. "
+        "I believe in your ability to grow and move forward. Would you like to talk about what's weighing on you? "
+        "I'm here, no judgment."
+    ),
+    "upset": (
+        "I'm sorry you're feeling upset. It's okay to feel this way—your feelings are valid. "
+        "Sometimes it helps to take a breath, or to talk about what's going on. "
+        "You don't have to figure it all out right now. What would feel most helpful—talking, or a small step to feel a bit better? "
+        "I'm here for you."
+    ),
+    "about_bot": (
+        "I'm here for you—that's what matters most. I'm a support chatbot, and I care about how you're doing. "
+        "How are you really feeling today? I'm listening, and I want to help. "
+        "You can share anything—I'm not here to judge, just to support."
+    ),
+    "appearance": (
+        "I want you to know that beauty is so much more than what we see in the mirror. "
+        "It's your kindness, your strength, the way you care about others, the things that make you *you*. "
+        "Everyone has their own unique beauty—including you. You have value that no one can take away. "
+        "I see you, and you matter. Would you like to talk more about what's been on your mind?"
+    ),
+    "breakdown": (
+        "It's okay to fall apart sometimes. You're human—and what you're feeling is valid. "
+        "You don't have to hold it all together right now. Take a breath. I'm here with you. "
+        "When things feel too heavy, it helps to talk. Would you like to share what's going on? "
+        "No judgment—just support."
+    ),
+    "lost_item": (
+        "Losing something important is really frustrating—I get it. It's okay to feel upset or stressed. "
+        "These things happen to everyone. Is there someone who can help you look, or help you report it if needed? "
+        "And remember—things can be replaced. You matter more. How are you holding up?"
+    ),
+    "ocd": (
+        "Intrusive or repetitive thoughts can be really distressing—I hear you. "
+        "You're not alone in experiencing this. OCD and similar struggles are treatable. "
+        "A therapist, especially one trained in CBT, can help you learn to manage these thoughts. "
+        "In the moment: try grounding (5 things you see, 4 you hear, 3 you touch). "
+        "Be gentle with yourself. Would you like to talk more about what you're experiencing?"
+    ),
+    "trauma": (
+        "Living with trauma can be exhausting and overwhelming. What you've been through matters, "
+        "and your reactions make sense. Healing takes time. A trauma-informed therapist can help you "
+        "work through this in a safe way. For now: you're safe in this moment. Grounding can help—"
+        "name 5 things you can see, 4 you can hear, 3 you can touch. "
+        "You don't have to face this alone. Would you like to share more?"
+    ),
+    "eating": (
+        "Struggling with food and body image is really hard—and you deserve support. "
+        "Eating disorders are serious but treatable. Beat (beateatingdisorders.org.uk) offers UK support: 0808 801 0677. "
+        "A GP or eating disorder specialist can help. You're not alone in this. "
+        "Would you like to talk about what you're going through?"
+    ),
+    "grief": (
+        "Grief is one of the hardest things we go through. There's no right way to feel—"
+        "sadness, anger, numbness, confusion—all of it is valid. "
+        "Cruse Bereavement Care (cruse.org.uk) offers UK support: 0808 808 1677. "
+        "Be gentle with yourself. Healing doesn't happen overnight. "
+        "Would you like to talk about the person you've lost?"
+    ),
+    "social_anxiety": (
+        "Social anxiety can feel really isolating—I hear you. It's more common than people think. "
+        "Small steps help: maybe start with one short conversation, or a small group. "
+        "A therapist can teach you CBT techniques that really work for social anxiety. "
+        "You're not weird or broken. Would you like to talk about what situations feel hardest?"
+    ),
+    "phobia": (
+        "Phobias can feel overwhelming—your fear is real and valid. "
+        "The good news: they're very treatable. Exposure therapy and CBT can help. "
+        "A therapist can work with you gradually. You don't have to face this alone. "
+        "What's been triggering you?"
+    ),
+    "burnout": (
+        "Burnout can leave you feeling empty and exhausted—I hear you. "
+        "Rest isn't selfish. Your body and mind are telling you they need a break. "
+        "Even small steps help: a short walk, saying no to one thing, talking to someone. "
+        "If work or study is the cause, consider speaking to a GP or occupational health. "
+        "You deserve to feel better. What would feel most manageable right now?"
+    ),
+    "imposter": (
+        "Imposter syndrome is so common—even people who seem confident feel it. "
+        "You're not a fraud. You've gotten where you are for a reason. "
+        "Try writing down one thing you've done well recently. Sometimes we're our own harshest critic. "
+        "A therapist can help you challenge these thoughts. You're capable. I believe in you."
+    ),
+    "perfectionism": (
+        "Perfectionism can be exhausting—it's hard to feel like nothing is ever good enough. "
+        "Done is often better than perfect. Try allowing yourself one 'good enough' today. "
+        "Your worth isn't tied to your output. A therapist can help you ease these standards. "
+        "Be kind to yourself. You're doing your best."
+    ),
+    "family": (
+        "Family issues can be really painful—they're the people we're supposed to feel closest to. "
+        "Your feelings are valid. Family conflict doesn't mean you're a bad person. "
+        "Relate (relate.org.uk) offers UK relationship and family counselling. "
+        "Talking to a therapist can help you understand and cope. Would you like to share more?"
+    ),
+    "bullying": (
+        "Being bullied is never your fault. It's painful and isolating—I'm sorry you're going through that. "
+        "You deserve to feel safe. If it's at school or work, consider telling someone in authority. "
+        "Bullying UK and Mind have resources. You're not alone. "
+        "Would you like to talk about what's been happening?"
+    ),
+    "health_anxiety": (
+        "Health anxiety can be really distressing—constantly worrying about illness is exhausting. "
+        "Your feelings are valid. A GP can help rule out health concerns and refer you if needed. "
+        "CBT is often effective for health anxiety. Try limiting how often you search symptoms online. "
+        "You're not alone in this. Would you like to talk more?"
+    ),
+    "numb": (
+        "Feeling numb or disconnected can be scary—like you're watching life from the outside. "
+        "It's often a way our mind protects us when things feel too much. "
+        "It's not permanent. Talking to a therapist can help you understand and reconnect. "
+        "Be gentle with yourself. Would you like to talk about what might have led to this?"
+    ),
+    "sad": (
+        "I'm really sorry you're feeling this way. What you're going through sounds hard, "
+        "and it takes courage to reach out. Remember: you don't have to face this alone, and this feeling won't last forever. "
+        "Talking to someone—a friend, family member, or therapist—can make a real difference. "
+        "You've already taken a step by being here. Would you like to share more? I'm here to listen and help you move forward."
+    ),
+    "panic": (
+        "Panic attacks can feel terrifying—like you're losing control. You're not. "
+        "Try: breathe in slowly for 4, hold for 4, breathe out for 6. Repeat. "
+        "Grounding: name 5 things you see, 4 you hear, 3 you can touch. "
+        "It will pass. You're safe. If panic attacks are frequent, a GP or therapist can help. "
+        "How are you feeling now?"
+    ),
+    "work_stress": (
+        "Work or study stress can be really draining. It's okay to feel overwhelmed. "
+        "Break things into smaller steps. Talk to a tutor, manager, or HR if things feel unmanageable. "
+        "Your wellbeing matters more than any grade or project. "
+        "What's feeling most urgent right now?"
+    ),
+    "focus": (
+        "Struggling with focus or concentration can be really frustrating. "
+        "It doesn't mean you're lazy—many people have ADHD or similar challenges. "
+        "A GP can refer you for assessment. In the meantime: break tasks into tiny steps, use timers, "
+        "and be kind to yourself. You're not broken. Would you like to talk more?"
+    ),
+    "comparison": (
+        "Comparing yourself to others can be really painful—it's human, but it's not helpful. "
+        "Everyone's journey is different. What you see of others is often a highlight reel. "
+        "Try focusing on one small thing you're grateful for or proud of. "
+        "You're on your own path. Be kind to yourself."
+    ),
+    "rejection": (
+        "Rejection and insecurity hurt—I hear you. Your worth isn't defined by one person's opinion. "
+        "It's okay to feel upset. Be gentle with yourself. "
+        "Talking to someone you trust, or a therapist, can help. "
+        "You matter. Would you like to talk more about what happened?"
+    ),
+    "motivation": (
+        "Low motivation can be a sign of depression or burnout—it's not laziness. "
+        "Be gentle with yourself. Even one small step counts: get out of bed, take a shower, go outside for 5 minutes. "
+        "If this has lasted a while, a GP can help. You're not alone in feeling this way. "
+        "What's one tiny thing you could do today?"
+    ),
+    "anxious": (
+        "Anxiety can feel overwhelming—I hear you. Try taking a few slow breaths: "
+        "breathe in for 4 counts, hold for 4, breathe out for 6. "
+        "Grounding can help too: name 5 things you can see, 4 you can hear, 3 you can touch. "
+        "If anxiety is affecting your daily life, a therapist can offer tools that really help. "
+        "What's been weighing on you lately?"
+    ),
+    "stress_practical": (
+        "I'm sorry—when something like a broken dress adds to your stress, it can feel like a lot. "
+        "It's okay to feel overwhelmed. First: take a breath. Second: can you fix the dress, borrow something, or find another option? "
+        "Third: remember that small setbacks don't define your day. You're doing your best. "
+        "What would feel most helpful right now—practical fix, or taking a moment to decompress?"
+    ),
+    "stress": (
+        "Feeling overwhelmed is exhausting, and it's okay to admit that. "
+        "Try breaking things into smaller steps—even one small thing at a time helps. "
+        "Short breaks, a walk, or talking to someone you trust can lighten the load. "
+        "You're doing your best, and that matters. What would feel most helpful right now?"
+    ),
+    "worth": (
+        "You are enough. You don't have to be perfect to deserve kindness—including from yourself. "
+        "We all have moments of doubt. That doesn't define you. I believe in you. "
+        "What's one small thing you're proud of, even if it feels tiny? Sometimes that helps us see our strength. "
+        "You can move past this. I'm here for you."
+    ),
+    "lonely": (
+        "Feeling alone is really painful—I'm sorry you're going through that. "
+        "You're not broken for feeling this way. Reaching out—even here—takes courage, and I'm glad you did. "
+        "Connection can start small: a text to someone, a walk in a busy place, or even just being here. "
+        "You matter. Would you like to talk more?"
+    ),
+    "cheating": (
+        "I'm so sorry—being cheated on is a huge betrayal. Your pain is valid. You deserve someone who chooses you. "
+        "It's okay to feel angry, hurt, or confused. You're not overreacting. "
+        "**What might help:** Talk to someone you trust. Consider taking space from him to think clearly. "
+        "You don't have to decide anything today. Relate (relate.org.uk) offers relationship counselling. "
+        "Would you like to talk about how you're feeling? I'm here."
+    ),
+    "head_relationship": (
+        "It sounds like you've been stressing yourself sick over this relationship—that's exhausting. "
+        "When someone hurts us, it can take over our thoughts. You deserve peace. "
+        "**Steps that help:** Limit how much you think about him. Focus on one thing you can control today. "
+        "Talk to a friend. Consider therapy if the pain feels too heavy. "
+        "If you meant a physical head injury from him, please reach out to someone safe—you deserve to be protected. "
+        "How are you holding up?"
+    ),
+    "head": (
+        "Stressing or worrying can feel overwhelming—like your head is full. "
+        "Try: take a breath, step away from screens, or talk to someone. "
+        "If you're in physical pain—please see a doctor or call 111. "
+        "How can I help?"
+    ),
+    "relationship": (
+        "Relationships can be really hard—whether it's a breakup, a fight, or something else. "
+        "Your feelings are valid. It's okay to hurt. Would you like to talk about what happened? "
+        "I'm here to listen, no judgment. Sometimes just sharing can help."
+    ),
+    "sleep": (
+        "Not being able to sleep is exhausting and frustrating. I hear you. "
+        "Try a wind-down routine: dim lights, no screens 30 min before bed, maybe some gentle music. "
+        "If sleep problems persist, a doctor or therapist can help. "
+        "How long has this been going on? I'm here to listen."
+    ),
+    "anger": (
+        "It's okay to feel angry or frustrated—those feelings are valid. "
+        "Sometimes we need to let it out. Try taking a few deep breaths, or stepping away for a moment. "
+        "What's been bothering you? I'm here to listen."
+    ),
+    "greeting": (
+        "Hi there! I'm here to listen and support you. "
+        "You can share how you're feeling—stress, anxiety, sadness, or anything else. "
+        "How are you doing today?"
+    ),
+    "thanks": (
+        "You're welcome. I'm really glad I could be here for you. "
+        "Remember, it's okay to reach out whenever you need support. Take care of yourself. 💙"
+    ),
+    "goodbye": (
+        "Take care of yourself. I'm here whenever you want to talk again. "
+        "If things ever feel too heavy, Samaritans are on 116 123 (24/7, free). 💙"
+    ),
+    "default": (
+        "Thank you for sharing. I'm here to listen and support you. "
+        "Whatever you're going through—stress, anxiety, sadness, or how you feel about yourself—"
+        "you don't have to face it alone. What would you like to talk about? I'm here to help you move forward."
+    ),
+}
 
-def get_fallback_response(user_message: str, recent_context: list[str] | None = None) -> str:
-    """Context-aware fallback when AI fails—specific, logical responses."""
-    msg = user_message.lower()
-    context = " ".join(recent_context or [])
-    full_context = f"{context} {msg}"
 
+# Fallback rules in priority order: (category, trigger phrases). The first category with a
+# phrase anywhere in the message wins; _classify_fallback applies the few extra guards.
+_FALLBACK_RULES: tuple[tuple[str, tuple[str, ...]], ...] = (
     # Self-hatred / disgust / "I hate myself" (high priority—avoid generic default)
-    if any(w in msg for w in ["hate myself", "hate me", "hating myself", "loathe myself", "wish i was dead", "want to disappear"]):
-        return (
-            "I'm really sorry you're hurting this much. What you're feeling is heavy—and it doesn't mean you're a bad person. "
-            "Many people have moments of intense self-criticism; it can be linked to depression or past hurt. "
-            "You deserve support: talking to Samaritans (116 123), your GP, or a therapist can help. "
-            "Right now: try naming one small thing that isn't terrible about today, even if it feels tiny. "
-            "I'm here with you. You matter."
-        )
-
-    if any(w in msg for w in ["disgusting", "revolting", "gross", "feel disgusting", "feeling disgusting", "i'm disgusting", "im disgusting"]):
-        return (
-            "Feeling disgusting or repelled by yourself is painful—and it's a feeling, not the truth about who you are. "
-            "Your worth isn't defined by how you feel in your worst moments. "
-            "If body image is part of this, remember many people struggle; Beat and Mind have resources. "
-            "Would you like to say more about what's behind this feeling? I'm listening."
-        )
-
+    ("self_hatred", ("hate myself", "hate me", "hating myself", "loathe myself", "wish i was dead", "want to disappear")),
+    ("disgust", ("disgusting", "revolting", "gross", "feel disgusting", "feeling disgusting", "i'm disgusting", "im disgusting")),
     # Hate everyone / misanthropy / anger at people
-    if any(w in msg for w in ["hate everyone", "hate people", "hate all people", "hate everybody", "everyone is awful", "i hate humans"]):
-        return (
-            "Feeling like you hate everyone can come from hurt, burnout, or feeling let down again and again. "
-            "Your anger makes sense if you've been wounded. It doesn't make you a bad person. "
-            "Sometimes talking to a therapist helps unpack where this is coming from. "
-            "Is there one situation or person that started this feeling? I'm here to listen."
-        )
-
+    ("hate_everyone", ("hate everyone", "hate people", "hate all people", "hate everybody", "everyone is awful", "i hate humans")),
     # Follow-up questions - use conversation context for relevant advice and SOLUTIONS
-    if any(w in msg for w in [
+    ("advice", (
         "what should i do", "what can i do", "what do you think", "what would you do",
         "any advice", "help me", "how do i get over", "how can i get over", "get over from",
-        "give me solution", "give me advice", "how to move on", "how can i move on",
-        "tell me how", "can you tell me how", "solution", "what to do"
-    ]):
-        # Breakup / cheating context - give concrete steps to move on
-        if any(w in full_context for w in ["boyfriend", "girlfriend", "cheating", "cheat", "breakup", "broke up", "into another", "another girl", "another guy", "worthless", "ugly"]):
-            return (
-                "I hear you—getting over a breakup, especially when there's been cheating, is really hard. Here are some steps that help:\n\n"
-                "1. **Allow yourself to feel** – Anger, sadness, and hurt are valid. Don't rush to 'get over it'.\n"
-                "2. **Limit contact** – Unfollow, mute, or block if it helps. Out of sight can help with healing.\n"
-                "3. **Lean on people** – Talk to a friend or family member. You don't have to do this alone.\n"
-                "4. **Focus on you** – One small thing you enjoy: a walk, a film, a hobby you've neglected.\n"
-                "5. **Time** – Healing isn't linear. Some days will be harder. That's okay.\n\n"
-                "You deserve someone who chooses you. His actions say nothing about your worth. "
-                "Relate (relate.org.uk) offers relationship counselling in the UK. Would you like to talk more?"
-            )
-        if any(w in full_context for w in ["trust", "don't trust", "trust anyone"]):
-            return (
-                "Based on what you've shared about trust—it's understandable if you've been hurt before. "
-                "**Steps that help:** Start with one small step—share something small with someone you feel safest with. "
-                "You don't have to trust everyone. A therapist can help you work through this in a safe space. "
-                "Mind (mind.org.uk) has resources: 0300 123 3393. What feels like the hardest part right now?"
-            )
-        if any(w in full_context for w in ["don't like", "don't like anyone", "whats wrong", "wrong with me"]):
-            return (
-                "Feeling disconnected doesn't mean something is wrong with you. "
-                "**What might help:** Be gentle with yourself. Try one small social step—even a short chat with someone. "
-                "Talking to a therapist can help you understand what's going on. "
-                "You don't have to figure it all out today. What would feel manageable right now?"
-            )
-        if any(w in full_context for w in ["sad", "depressed", "down", "lonely", "alone"]):
-            return (
-                "When you're feeling low, small steps matter:\n\n"
-                "1. **Reach out** – Text one person. You don't have to explain everything.\n"
-                "2. **Get outside** – Even 10 minutes of fresh air can help.\n"
-                "3. **Routine** – One small thing at the same time each day (e.g. morning stretch).\n"
-                "4. **Talk to a GP** – If this has lasted weeks, they can help or refer you.\n\n"
-                "Samaritans (116 123) are there 24/7 if you need to talk. You're not alone."
-            )
-        if any(w in full_context for w in ["dress", "broke", "broken", "stress"]):
-            return (
-                "When small things add to our stress: (1) Take a breath. (2) Can you fix it, borrow something, or find an alternative? "
-                "(3) Remember—a dress is just a thing. You matter more. What's one small step you can take right now?"
-            )
-        return (
-            "Here's what might help: take one small step at a time. Be gentle with yourself. "
-            "Talking to someone you trust—a friend, family member, or therapist—can make a big difference. "
-            "If you'd like to share what's going on, I can give more specific advice. What feels most doable for you right now?"
-        )
-
+        "give me solution", "give me advice", "how to move on", "how can i move on", "tell me how",
+        "can you tell me how", "solution", "what to do",
+    )),
     # Trust issues
-    if any(w in msg for w in ["don't trust", "dont trust", "can't trust", "cant trust", "trust anyone", "trust nobody", "dont trust anyone", "don't trust anyone"]):
-        return (
-            "Not being able to trust people can feel really lonely and isolating. "
-            "It's understandable if you've been hurt before—that can make it hard to open up. "
-            "Trust can be built slowly, one small step at a time. You don't have to trust everyone. "
-            "Would you like to talk about what happened? I'm here, and I'm not going anywhere. "
-            "A therapist can also help you work through this in a safe way."
-        )
-
+    ("trust", ("don't trust", "dont trust", "can't trust", "cant trust", "trust anyone", "trust nobody", "dont trust anyone", "don't trust anyone")),
     # Don't like anyone / disconnected / what's wrong with me
-    if any(w in msg for w in ["don't like anyone", "dont like anyone", "dont like", "whats wrong w me", "wrong with me", "idk whats wrong", "something wrong with me"]):
-        return (
-            "Feeling disconnected from people can be confusing and lonely. "
-            "It doesn't mean something is wrong with you—sometimes we go through phases, or we need time to heal. "
-            "It could be depression, past hurt, or just needing a break. You don't have to have it all figured out. "
-            "Talking to a therapist can help you understand what's going on. "
-            "For now: be kind to yourself. You're not broken. Would you like to talk more about what you're feeling?"
-        )
-
+    ("disconnected", (
+        "don't like anyone", "dont like anyone", "dont like", "whats wrong w me", "wrong with me",
+        "idk whats wrong", "something wrong with me",
+    )),
     # Things broke / practical problems (dress, etc.) - exclude "broke my head"
-    if any(w in msg for w in ["broke", "broken", "tore", "ripped", "ruined"]) and "head" not in msg:
-        if "dress" in msg or "clothes" in msg or "outfit" in msg:
-            return (
-                "I'm sorry your dress broke—that's frustrating, especially if it mattered to you or you had plans. "
-                "It's okay to feel upset. These things happen. Can you fix it, borrow something, or find an alternative? "
-                "And remember—a dress doesn't define you. You're more than what you wear. "
-                "How are you holding up? Is there something else adding to the stress?"
-            )
-        return (
-            "I'm sorry that happened—it's frustrating when things break. "
-            "It's okay to feel upset. Can you fix it or find a workaround? "
-            "Sometimes small things feel big when we're already stressed. How are you doing?"
-        )
-
+    ("broke", ("broke", "broken", "tore", "ripped", "ruined")),
     # Bad person / guilt / shame
-    if any(w in msg for w in ["bad person", "am i bad", "am i evil", "guilty", "guilt", "shame", "did something wrong", "terrible person"]):
-        return (
-            "Feeling guilty doesn't make you a bad person—it means you care. Everyone makes mistakes. "
-            "What matters is that you're trying to be better. You're not defined by one moment or one choice. "
-            "I believe in your ability to grow and move forward. Would you like to talk about what's weighing on you? "
-            "I'm here, no judgment."
-        )
-
+    ("guilt", ("bad person", "am i bad", "am i evil", "guilty", "guilt", "shame", "did something wrong", "terrible person")),
     # Upset (general)
-    if any(w in msg for w in ["upset", "unhappy", "not okay", "not ok", "feeling bad", "feel bad"]):
-        return (
-            "I'm sorry you're feeling upset. It's okay to feel this way—your feelings are valid. "
-            "Sometimes it helps to take a breath, or to talk about what's going on. "
-            "You don't have to figure it all out right now. What would feel most helpful—talking, or a small step to feel a bit better? "
-            "I'm here for you."
-        )
-
+    ("upset", ("upset", "unhappy", "not okay", "not ok", "feeling bad", "feel bad")),
     # Meta questions about the chatbot
-    if any(w in msg for w in ["are you ", "you a bot", "you a chatbot", "happy to be", "who are you", "what are you"]):
-        return (
-            "I'm here for you—that's what matters most. I'm a support chatbot, and I care about how you're doing. "
-            "How are you really feeling today? I'm listening, and I want to help. "
-            "You can share anything—I'm not here to judge, just to support."
-        )
-
+    ("about_bot", ("are you ", "you a bot", "you a chatbot", "happy to be", "who are you", "what are you")),
     # Body image / self-worth / feeling ugly
-    if any(w in msg for w in ["ugly", "unattractive", "unpretty", "hideous", "look bad", "hate how i look", "feel ugly"]):
-        return (
-            "I want you to know that beauty is so much more than what we see in the mirror. "
-            "It's your kindness, your strength, the way you care about others, the things that make you *you*. "
-            "Everyone has their own unique beauty—including you. You have value that no one can take away. "
-            "I see you, and you matter. Would you like to talk more about what's been on your mind?"
-        )
-
+    ("appearance", ("ugly", "unattractive", "unpretty", "hideous", "look bad", "hate how i look", "feel ugly")),
     # Emotional breakdown / overwhelmed
-    if any(w in msg for w in ["breakdown", "breaking down", "falling apart", "can't take it", "can't cope", "losing it"]):
-        return (
-            "It's okay to fall apart sometimes. You're human—and what you're feeling is valid. "
-            "You don't have to hold it all together right now. Take a breath. I'm here with you. "
-            "When things feel too heavy, it helps to talk. Would you like to share what's going on? "
-            "No judgment—just support."
-        )
-
+    ("breakdown", ("breakdown", "breaking down", "falling apart", "can't take it", "can't cope", "losing it")),
     # Lost something (phone, keys, etc.)
-    if any(w in msg for w in ["lost my", "lost the", "can't find", "misplaced", "stolen"]):
-        return (
-            "Losing something important is really frustrating—I get it. It's okay to feel upset or stressed. "
-            "These things happen to everyone. Is there someone who can help you look, or help you report it if needed? "
-            "And remember—things can be replaced. You matter more. How are you holding up?"
-        )
-
+    ("lost_item", ("lost my", "lost the", "can't find", "misplaced", "stolen")),
     # OCD / intrusive thoughts
-    if any(w in msg for w in ["ocd", "intrusive thoughts", "cant stop thinking", "can't stop thinking", "repetitive thoughts", "obsessive", "compulsive", "unwanted thoughts"]):
-        return (
-            "Intrusive or repetitive thoughts can be really distressing—I hear you. "
-            "You're not alone in experiencing this. OCD and similar struggles are treatable. "
-            "A therapist, especially one trained in CBT, can help you learn to manage these thoughts. "
-            "In the moment: try grounding (5 things you see, 4 you hear, 3 you touch). "
-            "Be gentle with yourself. Would you like to talk more about what you're experiencing?"
-        )
-
+    ("ocd", (
+        "ocd", "intrusive thoughts", "cant stop thinking", "can't stop thinking",
+        "repetitive thoughts", "obsessive", "compulsive", "unwanted thoughts",
+    )),
     # PTSD / trauma
-    if any(w in msg for w in ["ptsd", "trauma", "traumatised", "traumatized", "flashback", "flashbacks", "nightmares", "triggered", "past abuse", "abused"]):
-        return (
-            "Living with trauma can be exhausting and overwhelming. What you've been through matters, "
-            "and your reactions make sense. Healing takes time. A trauma-informed therapist can help you "
-            "work through this in a safe way. For now: you're safe in this moment. Grounding can help—"
-            "name 5 things you can see, 4 you can hear, 3 you can touch. "
-            "You don't have to face this alone. Would you like to share more?"
-        )
-
+    ("trauma", ("ptsd", "trauma", "traumatised", "traumatized", "flashback", "flashbacks", "nightmares", "triggered", "past abuse", "abused")),
     # Eating disorders
-    if any(w in msg for w in ["eating disorder", "anorexia", "bulimia", "binge eating", "not eating", "starving myself", "purge", "body image", "weight obsession"]):
-        return (
-            "Struggling with food and body image is really hard—and you deserve support. "
-            "Eating disorders are serious but treatable. Beat (beateatingdisorders.org.uk) offers UK support: 0808 801 0677. "
-            "A GP or eating disorder specialist can help. You're not alone in this. "
-            "Would you like to talk about what you're going through?"
-        )
-
+    ("eating", (
+        "eating disorder", "anorexia", "bulimia", "binge eating", "not eating", "starving myself",
+        "purge", "body image", "weight obsession",
+    )),
     # Grief / bereavement
-    if any(w in msg for w in ["grief", "grieving", "bereavement", "lost someone", "someone died", "death of", "passed away", "mourning"]):
-        return (
-            "Grief is one of the hardest things we go through. There's no right way to feel—"
-            "sadness, anger, numbness, confusion—all of it is valid. "
-            "Cruse Bereavement Care (cruse.org.uk) offers UK support: 0808 808 1677. "
-            "Be gentle with yourself. Healing doesn't happen overnight. "
-            "Would you like to talk about the person you've lost?"
-        )
-
+    ("grief", ("grief", "grieving", "bereavement", "lost someone", "someone died", "death of", "passed away", "mourning")),
     # Social anxiety
-    if any(w in msg for w in ["social anxiety", "socially anxious", "awkward around people", "fear of people", "scared of people", "cant talk to people", "can't talk to people"]):
-        return (
-            "Social anxiety can feel really isolating—I hear you. It's more common than people think. "
-            "Small steps help: maybe start with one short conversation, or a small group. "
-            "A therapist can teach you CBT techniques that really work for social anxiety. "
-            "You're not weird or broken. Would you like to talk about what situations feel hardest?"
-        )
-
+    ("social_anxiety", (
+        "social anxiety", "socially anxious", "awkward around people", "fear of people",
+        "scared of people", "cant talk to people", "can't talk to people",
+    )),
     # Phobias / specific fears
-    if any(w in msg for w in ["phobia", "phobic", "terrified of", "scared of", "fear of", "afraid of"]):
-        return (
-            "Phobias can feel overwhelming—your fear is real and valid. "
-            "The good news: they're very treatable. Exposure therapy and CBT can help. "
-            "A therapist can work with you gradually. You don't have to face this alone. "
-            "What's been triggering you?"
-        )
-
+    ("phobia", ("phobia", "phobic", "terrified of", "scared of", "fear of", "afraid of")),
     # Burnout / exhaustion
-    if any(w in msg for w in ["burnout", "burned out", "burnt out", "exhausted", "drained", "no energy", "no motivation"]):
-        return (
-            "Burnout can leave you feeling empty and exhausted—I hear you. "
-            "Rest isn't selfish. Your body and mind are telling you they need a break. "
-            "Even small steps help: a short walk, saying no to one thing, talking to someone. "
-            "If work or study is the cause, consider speaking to a GP or occupational health. "
-            "You deserve to feel better. What would feel most manageable right now?"
-        )
-
+    ("burnout", ("burnout", "burned out", "burnt out", "exhausted", "drained", "no energy", "no motivation")),
     # Imposter syndrome / fear of failure
-    if any(w in msg for w in ["imposter", "impostor", "fraud", "don't deserve", "fear of failure", "failing", "will fail"]):
-        return (
-            "Imposter syndrome is so common—even people who seem confident feel it. "
-            "You're not a fraud. You've gotten where you are for a reason. "
-            "Try writing down one thing you've done well recently. Sometimes we're our own harshest critic. "
-            "A therapist can help you challenge these thoughts. You're capable. I believe in you."
-        )
-
+    ("imposter", ("imposter", "impostor", "fraud", "don't deserve", "fear of failure", "failing", "will fail")),
     # Perfectionism
-    if any(w in msg for w in ["perfectionist", "perfectionism", "must be perfect", "anything less than perfect"]):
-        return (
-            "Perfectionism can be exhausting—it's hard to feel like nothing is ever good enough. "
-            "Done is often better than perfect. Try allowing yourself one 'good enough' today. "
-            "Your worth isn't tied to your output. A therapist can help you ease these standards. "
-            "Be kind to yourself. You're doing your best."
-        )
-
+    ("perfectionism", ("perfectionist", "perfectionism", "must be perfect", "anything less than perfect")),
     # Family issues
-    if any(w in msg for w in ["family", "parents", "mother", "father", "mum", "dad", "sibling", "brother", "sister", "family conflict"]):
-        return (
-            "Family issues can be really painful—they're the people we're supposed to feel closest to. "
-            "Your feelings are valid. Family conflict doesn't mean you're a bad person. "
-            "Relate (relate.org.uk) offers UK relationship and family counselling. "
-            "Talking to a therapist can help you understand and cope. Would you like to share more?"
-        )
-
+    ("family", ("family", "parents", "mother", "father", "mum", "dad", "sibling", "brother", "sister", "family conflict")),
     # Bullying
-    if any(w in msg for w in ["bullied", "bullying", "bully", "picked on", "harassed"]):
-        return (
-            "Being bullied is never your fault. It's painful and isolating—I'm sorry you're going through that. "
-            "You deserve to feel safe. If it's at school or work, consider telling someone in authority. "
-            "Bullying UK and Mind have resources. You're not alone. "
-            "Would you like to talk about what's been happening?"
-        )
-
+    ("bullying", ("bullied", "bullying", "bully", "picked on", "harassed")),
     # Health anxiety
-    if any(w in msg for w in ["health anxiety", "hypochondria", "hypochondriac", "worried about my health", "think i'm sick", "convinced i have"]):
-        return (
-            "Health anxiety can be really distressing—constantly worrying about illness is exhausting. "
-            "Your feelings are valid. A GP can help rule out health concerns and refer you if needed. "
-            "CBT is often effective for health anxiety. Try limiting how often you search symptoms online. "
-            "You're not alone in this. Would you like to talk more?"
-        )
-
+    ("health_anxiety", ("health anxiety", "hypochondria", "hypochondriac", "worried about my health", "think i'm sick", "convinced i have")),
     # Numbness / detachment
-    if any(w in msg for w in ["numb", "numbness", "detached", "disconnected", "feel nothing", "empty inside", "going through motions"]):
-        return (
-            "Feeling numb or disconnected can be scary—like you're watching life from the outside. "
-            "It's often a way our mind protects us when things feel too much. "
-            "It's not permanent. Talking to a therapist can help you understand and reconnect. "
-            "Be gentle with yourself. Would you like to talk about what might have led to this?"
-        )
-
+    ("numb", ("numb", "numbness", "detached", "disconnected", "feel nothing", "empty inside", "going through motions")),
     # Sadness / depression
-    if any(w in msg for w in ["sad", "down", "depressed", "hopeless", "miserable", "empty", "low mood", "feeling low"]):
-        return (
-            "I'm really sorry you're feeling this way. What you're going through sounds hard, "
-            "and it takes courage to reach out. Remember: you don't have to face this alone, and this feeling won't last forever. "
-            "Talking to someone—a friend, family member, or therapist—can make a real difference. "
-            "You've already taken a step by being here. Would you like to share more? I'm here to listen and help you move forward."
-        )
-
+    ("sad", ("sad", "down", "depressed", "hopeless", "miserable", "empty", "low mood", "feeling low")),
     # Panic attacks (more specific)
-    if any(w in msg for w in ["panic attack", "panic attacks", "had a panic", "having a panic"]):
-        return (
-            "Panic attacks can feel terrifying—like you're losing control. You're not. "
-            "Try: breathe in slowly for 4, hold for 4, breathe out for 6. Repeat. "
-            "Grounding: name 5 things you see, 4 you hear, 3 you can touch. "
-            "It will pass. You're safe. If panic attacks are frequent, a GP or therapist can help. "
-            "How are you feeling now?"
-        )
-
+    ("panic", ("panic attack", "panic attacks", "had a panic", "having a panic")),
     # Work / school stress
-    if any(w in msg for w in ["work stress", "job stress", "boss", "colleague", "exam", "exams", "deadline", "deadlines", "assignment", "university", "college"]):
-        return (
-            "Work or study stress can be really draining. It's okay to feel overwhelmed. "
-            "Break things into smaller steps. Talk to a tutor, manager, or HR if things feel unmanageable. "
-            "Your wellbeing matters more than any grade or project. "
-            "What's feeling most urgent right now?"
-        )
-
+    ("work_stress", (
+        "work stress", "job stress", "boss", "colleague", "exam", "exams", "deadline", "deadlines",
+        "assignment", "university", "college",
+    )),
     # ADHD
-    if any(w in msg for w in ["adhd", "add", "focus", "concentration", "can't focus", "cant concentrate", "distracted", "easily distracted"]):
-        return (
-            "Struggling with focus or concentration can be really frustrating. "
-            "It doesn't mean you're lazy—many people have ADHD or similar challenges. "
-            "A GP can refer you for assessment. In the meantime: break tasks into tiny steps, use timers, "
-            "and be kind to yourself. You're not broken. Would you like to talk more?"
-        )
-
+    ("focus", ("adhd", "add", "focus", "concentration", "can't focus", "cant concentrate", "distracted", "easily distracted")),
     # Jealousy / comparison
-    if any(w in msg for w in ["jealous", "jealousy", "comparing myself", "compare myself", "everyone else is", "others have it better"]):
-        return (
-            "Comparing yourself to others can be really painful—it's human, but it's not helpful. "
-            "Everyone's journey is different. What you see of others is often a highlight reel. "
-            "Try focusing on one small thing you're grateful for or proud of. "
-            "You're on your own path. Be kind to yourself."
-        )
-
+    ("comparison", ("jealous", "jealousy", "comparing myself", "compare myself", "everyone else is", "others have it better")),
     # Rejection / insecurity
-    if any(w in msg for w in ["rejected", "rejection", "insecure", "insecurity", "not good enough for"]):
-        return (
-            "Rejection and insecurity hurt—I hear you. Your worth isn't defined by one person's opinion. "
-            "It's okay to feel upset. Be gentle with yourself. "
-            "Talking to someone you trust, or a therapist, can help. "
-            "You matter. Would you like to talk more about what happened?"
-        )
-
+    ("rejection", ("rejected", "rejection", "insecure", "insecurity", "not good enough for")),
     # Low motivation
-    if any(w in msg for w in ["no motivation", "unmotivated", "cant get out of bed", "can't get out of bed", "procrastinating", "procrastination"]):
-        return (
-            "Low motivation can be a sign of depression or burnout—it's not laziness. "
-            "Be gentle with yourself. Even one small step counts: get out of bed, take a shower, go outside for 5 minutes. "
-            "If this has lasted a while, a GP can help. You're not alone in feeling this way. "
-            "What's one tiny thing you could do today?"
-        )
-
+    ("motivation", ("no motivation", "unmotivated", "cant get out of bed", "can't get out of bed", "procrastinating", "procrastination")),
     # Anxiety
-    if any(w in msg for w in ["anxious", "anxiety", "worried", "nervous", "panic", "scared", "frightened", "afraid"]):
-        return (
-            "Anxiety can feel overwhelming—I hear you. Try taking a few slow breaths: "
-            "breathe in for 4 counts, hold for 4, breathe out for 6. "
-            "Grounding can help too: name 5 things you can see, 4 you can hear, 3 you can touch. "
-            "If anxiety is affecting your daily life, a therapist can offer tools that really help. "
-            "What's been weighing on you lately?"
-        )
-
+    ("anxious", ("anxious", "anxiety", "worried", "nervous", "panic", "scared", "frightened", "afraid")),
     # Stress / overwhelm (check for specific cause like dress)
-    if any(w in msg for w in ["stress", "stressed", "overwhelmed", "pressure", "burnout", "too much"]):
-        if "dress" in msg or "broke" in msg or "broken" in msg:
-            return (
-                "I'm sorry—when something like a broken dress adds to your stress, it can feel like a lot. "
-                "It's okay to feel overwhelmed. First: take a breath. Second: can you fix the dress, borrow something, or find another option? "
-                "Third: remember that small setbacks don't define your day. You're doing your best. "
-                "What would feel most helpful right now—practical fix, or taking a moment to decompress?"
-            )
-        return (
-            "Feeling overwhelmed is exhausting, and it's okay to admit that. "
-            "Try breaking things into smaller steps—even one small thing at a time helps. "
-            "Short breaks, a walk, or talking to someone you trust can lighten the load. "
-            "You're doing your best, and that matters. What would feel most helpful right now?"
-        )
-
+    ("stress", ("stress", "stressed", "overwhelmed", "pressure", "burnout", "too much")),
     # Self-esteem / not good enough / stupid
-    if any(w in msg for w in ["not good enough", "worthless", "useless", "failure", "stupid", "dumb", "can't do anything", "am i stupid"]):
-        return (
-            "You are enough. You don't have to be perfect to deserve kindness—including from yourself. "
-            "We all have moments of doubt. That doesn't define you. I believe in you. "
-            "What's one small thing you're proud of, even if it feels tiny? Sometimes that helps us see our strength. "
-            "You can move past this. I'm here for you."
-        )
-
+    ("worth", ("not good enough", "worthless", "useless", "failure", "stupid", "dumb", "can't do anything", "am i stupid")),
     # Loneliness
-    if any(w in msg for w in ["lonely", "alone", "no friends", "isolated", "left out"]):
-        return (
-            "Feeling alone is really painful—I'm sorry you're going through that. "
-            "You're not broken for feeling this way. Reaching out—even here—takes courage, and I'm glad you did. "
-            "Connection can start small: a text to someone, a walk in a busy place, or even just being here. "
-            "You matter. Would you like to talk more?"
-        )
-
+    ("lonely", ("lonely", "alone", "no friends", "isolated", "left out")),
     # Cheating / infidelity
-    if any(w in msg for w in ["cheating", "cheat", "cheated", "into another girl", "into another guy", "another woman", "another man", "he is into", "she is into"]):
-        return (
-            "I'm so sorry—being cheated on is a huge betrayal. Your pain is valid. You deserve someone who chooses you. "
-            "It's okay to feel angry, hurt, or confused. You're not overreacting. "
-            "**What might help:** Talk to someone you trust. Consider taking space from him to think clearly. "
-            "You don't have to decide anything today. Relate (relate.org.uk) offers relationship counselling. "
-            "Would you like to talk about how you're feeling? I'm here."
-        )
-
+    ("cheating", (
+        "cheating", "cheat", "cheated", "into another girl", "into another guy", "another woman",
+        "another man", "he is into", "she is into",
+    )),
     # "Broke my head" - idiom for stressing/worrying over someone (or literal head injury)
-    if ("broke" in msg and "head" in msg) or ("breaking" in msg and "head" in msg):
-        if any(w in full_context for w in ["boyfriend", "girlfriend", "relationship", "cheat"]):
-            return (
-                "It sounds like you've been stressing yourself sick over this relationship—that's exhausting. "
-                "When someone hurts us, it can take over our thoughts. You deserve peace. "
-                "**Steps that help:** Limit how much you think about him. Focus on one thing you can control today. "
-                "Talk to a friend. Consider therapy if the pain feels too heavy. "
-                "If you meant a physical head injury from him, please reach out to someone safe—you deserve to be protected. "
-                "How are you holding up?"
-            )
-        return (
-            "Stressing or worrying can feel overwhelming—like your head is full. "
-            "Try: take a breath, step away from screens, or talk to someone. "
-            "If you're in physical pain—please see a doctor or call 111. "
-            "How can I help?"
-        )
-
+    ("head", ("broke", "breaking")),
     # Relationship / breakup / fight
-    if any(w in msg for w in ["breakup", "broke up", "relationship", "fight", "argument", "ex", "boyfriend", "girlfriend"]):
-        return (
-            "Relationships can be really hard—whether it's a breakup, a fight, or something else. "
-            "Your feelings are valid. It's okay to hurt. Would you like to talk about what happened? "
-            "I'm here to listen, no judgment. Sometimes just sharing can help."
-        )
-
+    ("relationship", ("breakup", "broke up", "relationship", "fight", "argument", "ex", "boyfriend", "girlfriend")),
     # Sleep issues
-    if any(w in msg for w in ["can't sleep", "insomnia", "tired", "exhausted", "no sleep"]):
-        return (
-            "Not being able to sleep is exhausting and frustrating. I hear you. "
-            "Try a wind-down routine: dim lights, no screens 30 min before bed, maybe some gentle music. "
-            "If sleep problems persist, a doctor or therapist can help. "
-            "How long has this been going on? I'm here to listen."
-        )
-
+    ("sleep", ("can't sleep", "insomnia", "tired", "exhausted", "no sleep")),
     # Irritability / anger
-    if any(w in msg for w in ["angry", "mad", "frustrated", "annoyed", "pissed", "irritable", "irritated", "short temper", "losing my temper"]):
-        return (
-            "It's okay to feel angry or frustrated—those feelings are valid. "
-            "Sometimes we need to let it out. Try taking a few deep breaths, or stepping away for a moment. "
-            "What's been bothering you? I'm here to listen."
-        )
-
+    ("anger", ("angry", "mad", "frustrated", "annoyed", "pissed", "irritable", "irritated", "short temper", "losing my temper")),
     # Standalone greetings only (not "Hi I am sad")
-    if _is_greeting_only(user_message):
-        return (
-            "Hi there! I'm here to listen and support you. "
-            "You can share how you're feeling—stress, anxiety, sadness, or anything else. "
-            "How are you doing today?"
-        )
-
+    ("greeting", ()),
     # Thanks
-    if any(w in msg for w in ["thank", "thanks", "appreciate"]):
-        return (
-            "You're welcome. I'm really glad I could be here for you. "
-            "Remember, it's okay to reach out whenever you need support. Take care of yourself. 💙"
-        )
+    ("thanks", ("thank", "thanks", "appreciate")),
+)
 
+# Refinements that look at earlier turns too: "advice" / "head" become the first matching
+# category here, or stay as they are
+_CONTEXT_RULES: dict[str, tuple[tuple[str, tuple[str, ...]], ...]] = {
+    "advice": (
+        # Breakup / cheating context - give concrete steps to move on
+        ("advice_breakup", (
+            "boyfriend", "girlfriend", "cheating", "cheat", "breakup", "broke up", "into another",
+            "another girl", "another guy", "worthless", "ugly",
+        )),
+        ("advice_trust", ("trust", "don't trust", "trust anyone")),
+        ("advice_disconnected", ("don't like", "don't like anyone", "whats wrong", "wrong with me")),
+        ("advice_low", ("sad", "depressed", "down", "lonely", "alone")),
+        ("advice_stress", ("dress", "broke", "broken", "stress")),
+    ),
+    # "Broke my head" reads as relationship stress when a partner came up recently
+    "head": (
+        ("head_relationship", ("boyfriend", "girlfriend", "relationship", "cheat")),
+    ),
+}
+
+
+def _compile_rules(rules: tuple[tuple[str, tuple[str, ...]], ...]) -> tuple[re.Pattern, dict[str, frozenset[int]]]:
+    """
+    One scan for a whole rule table. The lookahead reports the (longest) trigger starting at
+    every position, and each matched trigger maps to the indexes of the rules it fires, plus
+    those of any trigger that is a prefix of it, since that occurs there too.
+    """
+    phrase_rules: dict[str, set[int]] = defaultdict(set)
+    for i, (_, phrases) in enumerate(rules):
+        for phrase in phrases:
+            phrase_rules[phrase].add(i)
+    hits = {
+        phrase: frozenset(i for other, idx in phrase_rules.items() if phrase.startswith(other) for i in idx)
+        for phrase in phrase_rules
+    }
+    return re.compile(f"(?=({_trie_pattern(phrase_rules)}))"), hits
+
+
+def _matched_rules(compiled: tuple[re.Pattern, dict[str, frozenset[int]]], text: str) -> set[int]:
+    """Indexes of every rule with a trigger phrase somewhere in text."""
+    pattern, hits = compiled
+    found: set[int] = set()
+    for m in pattern.finditer(text):
+        found |= hits[m.group(1)]
+    return found
+
+
+_FALLBACK_MATCHER = _compile_rules(_FALLBACK_RULES)
+_GREETING_RULE = next(i for i, (category, _) in enumerate(_FALLBACK_RULES) if category == "greeting")
+_CONTEXT_MATCHERS = {category: _compile_rules(rules) for category, rules in _CONTEXT_RULES.items()}
+
+
+@lru_cache(maxsize=1024)
+def _classify_fallback(msg: str) -> str:
+    """
+    Fallback category for a case-folded message.
+    Cached on the message alone (greetings and thanks repeat a lot). Categories that depend on
+    earlier turns come back as "advice" / "head" and are refined by the caller.
+    """
+    hits = _matched_rules(_FALLBACK_MATCHER, msg)
+    if _is_greeting_only(msg):
+        hits.add(_GREETING_RULE)
+    for i in sorted(hits):
+        category = _FALLBACK_RULES[i][0]
+        if category == "broke":
+            # Exclude "broke my head"; a broken dress gets its own reply
+            if "head" in msg:
+                continue
+            if "dress" in msg or "clothes" in msg or "outfit" in msg:
+                return "broke_clothes"
+        elif category == "stress":
+            # Check for a specific cause like a dress
+            if "dress" in msg or "broke" in msg or "broken" in msg:
+                return "stress_practical"
+        elif category == "head" and "head" not in msg:
+            continue
+        return category
     # Default - warm, motivating, inviting
-    return (
-        "Thank you for sharing. I'm here to listen and support you. "
-        "Whatever you're going through—stress, anxiety, sadness, or how you feel about yourself—"
-        "you don't have to face it alone. What would you like to talk about? I'm here to help you move forward."
-    )
+    return "default"
+
+
+def _refine_with_context(category: str, full_context: str) -> str:
+    """Pick the context-dependent flavour of category from the recent conversation."""
+    hits = _matched_rules(_CONTEXT_MATCHERS[category], full_context)
+    return _CONTEXT_RULES[category][min(hits)][0] if hits else category
+
+
+# Standalone greetings, thanks and goodbyes get a fixed reply without an LLM call. Whole-message
+# matches only, like _GREETING_ONLY_RE: "thanks but I still feel awful" goes to the model.
+_CANNED_INTENTS = (
+    ("greeting", _GREETING_ONLY_RE),
+    ("thanks", re.compile(r"(?:thanks?(?:\s+you)?(?:\s+(?:so|very)\s+much|\s+a\s+lot)?|thx|ty|cheers)[\s!.]*")),
+    ("goodbye", re.compile(r"(?:bye|goodbye|good\s*night|see\s+(?:you|ya)(?:\s+later)?)[\s!.]*")),
+)
+
+
+def _canned_reply(msg_lower: str) -> str | None:
+    """Fixed reply for a standalone greeting, thanks or goodbye; None for anything else."""
+    s = msg_lower.strip()
+    if len(s) > 80:
+        return None
+    for category, pattern in _CANNED_INTENTS:
+        if pattern.fullmatch(s):
+            return _FALLBACK_RESPONSES[category]
+    return None
+
+
+def get_fallback_response(
+    user_message: str,
+    recent_context: list[str] | None = None,
+    msg_lower: str | None = None,
+) -> str:
+    """Context-aware fallback when AI fails—specific, logical responses."""
+    msg = msg_lower if msg_lower is not None else user_message.casefold()
+    category = _classify_fallback(msg)
+    if category in _CONTEXT_RULES:
+        category = _refine_with_context(category, f"{' '.join(recent_context or [])} {msg}")
+    return _FALLBACK_RESPONSES[category]
+
+
+AI_NOT_CONFIGURED_TEXT = (
+    "AI is not configured. Add one of: LOCAL_LLM_URL (Ollama/LM Studio), GEMINI_API_KEY (free at aistudio.google.com/apikey), "
+    "or GROQ_API_KEY (free at console.groq.com) in your environment."
+)
+
+
+def _get_session(session_id: str) -> dict:
+    """Return the session record, creating it if needed."""
+    with _conversations_lock:
+        sess = conversations.get(session_id)
+        if sess is None:
+            # New session, or an idle one that was evicted: start again from the greeting
+            sess = _new_session()
+            conversations[session_id] = sess
+        return sess
+
+
+def _duplicate_reply(sess: dict, msg_lower: str) -> str | None:
+    """
+    The last reply, if this message repeats the one it answered moments ago; caller holds
+    sess["lock"]. A duplicate that arrives mid-turn waits on the lock, then lands here.
+    """
+    last = sess["last_turn"]
+    if last and last[0] == msg_lower and time.monotonic() - last[2] < _DUPLICATE_WINDOW_SECS:
+        return last[1]
+    return None
+
+
+def _begin_turn(sess: dict, user_message: str, msg_lower: str | None = None) -> tuple[list, list]:
+    """
+    Append the user message to the session; caller holds sess["lock"].
+    Returns (history, gemini_contents) snapshots for this turn.
+    """
+    _append_message(sess, {"role": "user", "content": user_message})
+    sess["recent_user"].append(msg_lower if msg_lower is not None else user_message.casefold())
+    return _session_history(sess), _session_gemini_contents(sess)
+
+
+def _finish_turn(session_id: str, sess: dict, assistant_message: str) -> None:
+    """Record the reply; caller holds sess["lock"]."""
+    _append_message(sess, {"role": "assistant", "content": assistant_message})
+    sess["last_turn"] = (sess["recent_user"][-1], assistant_message, time.monotonic())
+    _compact_session(sess)
+    if sess["folded"] >= _CONDENSE_EVERY and not sess["condensing"] and LLM_SUMMARIES_ENABLED:
+        sess["folded"] = 0
+        sess["condensing"] = True
+        _SUMMARY_POOL.submit(_condense_summary, sess, sess["summary"]["content"][len(_SUMMARY_PREFIX):])
+    with _conversations_lock:
+        # Re-store on every turn so the TTL counts from the latest activity
+        conversations[session_id] = sess
+
+
+def _record_outcome(provider: str, ok: bool) -> None:
+    """Fold one call into the provider's failure-rate EWMA, opening its circuit past the limit."""
+    rate = (1 - _ERROR_EWMA_ALPHA) * _provider_errors[provider] + (0.0 if ok else _ERROR_EWMA_ALPHA)
+    _provider_errors[provider] = rate
+    if not ok and rate > _CIRCUIT_ERROR_RATE:
+        _circuit_open_until[provider] = time.monotonic() + _CIRCUIT_OPEN_SECS
+
+
+def _circuit_open(provider: str) -> bool:
+    return time.monotonic() < _circuit_open_until[provider]
+
+
+def _cloud_calls(history: list, gemini_contents: list | None = None) -> list[tuple]:
+    """
+    (name, fn, args) for each configured cloud provider, in preference order, except that
+    providers with an open circuit go last.
+    """
+    calls = []
+    if GEMINI_API_KEY:
+        calls.append(("gemini", _get_gemini_response, (history, GEMINI_API_KEY, gemini_contents)))
+    if GROQ_API_KEY:
+        calls.append(("groq", _get_groq_response, (history, GROQ_API_KEY)))
+    if OPENAI_API_KEY:
+        calls.append(("openai", _get_openai_response, (history, OPENAI_API_KEY)))
+    return sorted(calls, key=lambda call: _circuit_open(call[0]))
+
+
+def _response_cache_key(history: list, msg_lower: str) -> bytes | None:
+    """
+    SHA-256 of this turn's provider input, with the closing user message normalised (case-folded,
+    whitespace collapsed). None when the reply must not be cached.
+    """
+    if RESPONSE_CACHE_TTL_SECS <= 0 or _TIME_SENSITIVE_RE.search(msg_lower):
+        return None
+    digest = hashlib.sha256(orjson.dumps(history[:-1]))
+    digest.update(b"\0" + " ".join(msg_lower.split()).encode())
+    return digest.digest()
+
+
+def _cached_reply(
+    history: list, history_for_llm: list, emotion_instruction: str, msg_lower: str
+) -> tuple[str | None, tuple]:
+    """
+    Earlier reply to this exact turn, else (with SEMANTIC_CACHE_ENABLED) to a paraphrase of the
+    message after the same prior turns and emotion context. Returns (reply or None, cache token
+    for _cache_reply).
+    """
+    key = _response_cache_key(history_for_llm, msg_lower)
+    if key is None:
+        return None, (None, None)
+    with _response_cache_lock:
+        reply = _response_cache.get(key)
+    if reply is not None or not semantic_cache.ENABLED:
+        return reply, (key, None)
+    # Summary and prior turns from the un-augmented history: the per-turn context message from
+    # _with_turn_context is left out, since its RAG snippets depend on the message text and
+    # paraphrases would otherwise never share a namespace
+    namespace = hashlib.sha256(orjson.dumps(history[1:-1]) + emotion_instruction.encode()).digest()
+    reply, embedding = semantic_cache.lookup(namespace, msg_lower)
+    return reply, (key, (namespace, embedding))
+
+
+def _cache_reply(token: tuple, reply: str) -> None:
+    key, semantic = token
+    if key is not None:
+        with _response_cache_lock:
+            _response_cache[key] = reply
+    if semantic is not None:
+        semantic_cache.store(*semantic, reply)
 
 
 def get_ai_response(
     user_message: str,
     session_id: str,
     emotion_instruction: str = "",
-) -> tuple[str, bool]:
-    """Get AI response. Tries: Local LLM → Gemini → Groq → OpenAI. Falls back to empathetic response if all fail."""
-    local_url = os.environ.get("LOCAL_LLM_URL", "").strip()
-    gemini_key = os.environ.get("GEMINI_API_KEY")
-    groq_key = os.environ.get("GROQ_API_KEY")
-    openai_key = os.environ.get("OPENAI_API_KEY")
-
-    if not local_url and not gemini_key and not groq_key and not openai_key:
-        return (
-            "AI is not configured. Add one of: LOCAL_LLM_URL (Ollama/LM Studio), GEMINI_API_KEY (free at aistudio.google.com/apikey), "
-            "or GROQ_API_KEY (free at console.groq.com) in your environment.",
-            False,
-        )
+    msg_lower: str | None = None,
+) -> tuple[str, bool, bool]:
+    """
+    Get AI response. Tries: Local LLM → Gemini → Groq → OpenAI. Falls back to empathetic response if all fail.
+    Standalone greetings, thanks and goodbyes are answered from _CANNED_INTENTS without a provider call.
+    Returns (response, is_crisis, duplicate); duplicate is True when the message repeated the one just
+    answered and got that reply again (see _duplicate_reply), so it is not a new turn.
+    """
+    if not AI_CONFIGURED:
+        return (AI_NOT_CONFIGURED_TEXT, False, False)
+
+    if msg_lower is None:
+        msg_lower = user_message.casefold()
+    sess = _get_session(session_id)
+    # One turn at a time per session, so history never interleaves
+    with sess["lock"]:
+        duplicate = _duplicate_reply(sess, msg_lower)
+        if duplicate is not None:
+            return (duplicate, False, True)
+        history, gemini_contents = _begin_turn(sess, user_message, msg_lower)
+
+        canned = _canned_reply(msg_lower)
+        if canned is not None:
+            _finish_turn(session_id, sess, canned)
+            return (canned, False, False)
+
+        # RAG + optional emotion / face / pattern context
+        history_for_llm, gemini_contents = _with_turn_context(history, gemini_contents, emotion_instruction)
+
+        cached, cache_token = _cached_reply(history, history_for_llm, emotion_instruction, msg_lower)
+        if cached is not None:
+            _finish_turn(session_id, sess, cached)
+            return (cached, False, False)
+
+        result = (None, "")
+        # 1. Local LLM (Ollama, LM Studio, or any OpenAI-compatible API).
+        # Never hedged: text only goes to a cloud provider if the local model fails.
+        if LOCAL_LLM_URL:
+            result = _get_local_llm_response(history_for_llm, LOCAL_LLM_URL)
+        # 2-4. Gemini (free) → Groq (free) → OpenAI (paid), hedged in that order
+        if result[0] is None:
+            cloud = _cloud_calls(history_for_llm, gemini_contents)
+            if cloud:
+                result = _first_successful_response(cloud)
+
+        if result and result[0] is not None:
+            assistant_message = result[0]
+            _cache_reply(cache_token, assistant_message)
+            _finish_turn(session_id, sess, assistant_message)
+            return (assistant_message, False, False)
+
+        # All AI failed—use context-aware fallback
+        recent = _get_recent_user_messages(sess)
+        return (get_fallback_response(user_message, recent, msg_lower), False, False)
+
+
+def stream_ai_response(
+    user_message: str,
+    session_id: str,
+    emotion_instruction: str = "",
+    msg_lower: str | None = None,
+) -> Generator[str, None, str | None]:
+    """
+    Streaming variant of get_ai_response: yields reply text chunks as the provider produces them.
+    Providers are tried in the same order but not hedged; one that fails before its first chunk
+    falls through to the next. If all fail, the context-aware fallback is yielded in one piece.
+    A repeat of the message just answered yields nothing and returns that earlier reply instead.
+    """
+    if not AI_CONFIGURED:
+        yield AI_NOT_CONFIGURED_TEXT
+        return
+
+    if msg_lower is None:
+        msg_lower = user_message.casefold()
+    sess = _get_session(session_id)
+    with sess["lock"]:
+        duplicate = _duplicate_reply(sess, msg_lower)
+        if duplicate is not None:
+            return duplicate
+        history, gemini_contents = _begin_turn(sess, user_message, msg_lower)
+
+        canned = _canned_reply(msg_lower)
+        if canned is not None:
+            yield canned
+            _finish_turn(session_id, sess, canned)
+            return
+
+        history_for_llm, gemini_contents = _with_turn_context(history, gemini_contents, emotion_instruction)
+
+        cached, cache_token = _cached_reply(history, history_for_llm, emotion_instruction, msg_lower)
+        if cached is not None:
+            yield cached
+            _finish_turn(session_id, sess, cached)
+            return
+
+        cloud = []
+        if GEMINI_API_KEY:
+            cloud.append(("gemini", _stream_gemini_response, (history_for_llm, GEMINI_API_KEY, gemini_contents)))
+        if GROQ_API_KEY:
+            cloud.append(("groq", _stream_groq_response, (history_for_llm, GROQ_API_KEY)))
+        if OPENAI_API_KEY:
+            cloud.append(("openai", _stream_openai_response, (history_for_llm, OPENAI_API_KEY)))
+        streams = sorted(cloud, key=lambda stream: _circuit_open(stream[0]))
+        if LOCAL_LLM_URL:
+            streams.insert(0, ("local", _stream_local_llm_response, (history_for_llm, LOCAL_LLM_URL)))
+
+        for name, fn, args in streams:
+            parts: list[str] = []
+            complete = False
+            try:
+                for chunk in fn(*args):
+                    parts.append(chunk)
+                    yield chunk
+                complete = True
+            except (LLMError, httpx.HTTPError, ValueError, KeyError, IndexError):
+                pass  # nothing sent yet → next provider; mid-stream → keep the partial reply
+            _record_outcome(name, bool(parts))
+            if parts:
+                reply = "".join(parts)
+                if complete:
+                    _cache_reply(cache_token, reply)
+                _finish_turn(session_id, sess, reply)
+                return
+
+        recent = _get_recent_user_messages(sess)
+        yield get_fallback_response(user_message, recent, msg_lower)
+
+
+def _http_client() -> httpx.Client:
+    """Return the process-wide pooled client, creating it once (thread-safe)."""
+    global _HTTP
+    if _HTTP is None:
+        with _HTTP_LOCK:
+            if _HTTP is None:
+                _HTTP = httpx.Client(
+                    http2=_HTTP2,
+                    timeout=httpx.Timeout(25.0, connect=3.0),
+                    limits=httpx.Limits(max_connections=200, max_keepalive_connections=50),
+                )
+    return _HTTP
+
+
+class LLMError(Exception):
+    """A provider call failed. Raised for every provider so callers never parse error text."""
+
+    def __init__(self, message: str, status_code: int | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class LLMAuthError(LLMError):
+    """Missing, invalid or revoked API key (401/403, or Gemini's 400 API_KEY_INVALID)."""
+
+
+class LLMRateLimitError(LLMError):
+    """429 from the provider; `retry_after` is the server's hint in seconds, if it sent one."""
+
+    def __init__(self, message: str, status_code: int | None = 429, retry_after: float | None = None):
+        super().__init__(message, status_code)
+        self.retry_after = retry_after
+
+
+class LLMUnavailableError(LLMError):
+    """Transient server-side failure (500/502/503/504): overloaded or restarting upstream."""
+
+
+class LLMTimeoutError(LLMError):
+    """The provider did not answer within the client timeout."""
+
+
+class LLMConnectionError(LLMError):
+    """The provider could not be reached or dropped the connection."""
+
+
+def _error_reasons(r: httpx.Response) -> set[str]:
+    """`reason` codes from a Google-style error body ({"error": {"details": [{"reason": ...}]}})."""
+    try:
+        details = orjson.loads(r.content).get("error", {}).get("details", [])
+        return {d.get("reason") for d in details if isinstance(d, dict)}
+    except (orjson.JSONDecodeError, AttributeError):
+        return set()
+
+
+def _check_status(r: httpx.Response) -> None:
+    """Map a non-2xx response onto the LLMError hierarchy."""
+    if r.is_success:
+        return
+    r.read()  # streamed responses have no body loaded yet
+    code = r.status_code
+    message = f"{r.request.url.host} returned HTTP {code}"
+    if code in (401, 403) or (code == 400 and "API_KEY_INVALID" in _error_reasons(r)):
+        raise LLMAuthError(message, code)
+    if code == 429:
+        try:
+            retry_after = float(r.headers.get("retry-after", ""))
+        except ValueError:
+            retry_after = None
+        raise LLMRateLimitError(message, code, retry_after)
+    if code in (500, 502, 503, 504):
+        raise LLMUnavailableError(message, code)
+    raise LLMError(message, code)
+
+
+def _is_transient(exc: BaseException) -> bool:
+    """
+    Rate limits, 5xx and connection-level failures are worth retrying; auth / bad requests are not,
+    and neither are timeouts: the provider already used its whole budget, so fail over instead.
+    """
+    return isinstance(exc, (LLMRateLimitError, LLMUnavailableError, LLMConnectionError))
+
+
+_backoff = wait_exponential_jitter(initial=0.5, max=4)
+
+
+def _retry_wait(retry_state) -> float:
+    """Honour Retry-After on 429s (capped at 4s), otherwise exponential backoff with jitter."""
+    exc = retry_state.outcome.exception()
+    if isinstance(exc, LLMRateLimitError) and exc.retry_after is not None:
+        return min(exc.retry_after, 4.0)
+    return _backoff(retry_state)
+
+
+def _send_json(url: str, headers: dict, payload: dict, timeout=httpx.USE_CLIENT_DEFAULT) -> dict:
+    """POST JSON through the shared client once; raises LLMError subclasses."""
+    try:
+        r = _http_client().post(url, headers=headers, json=payload, timeout=timeout)
+    except httpx.TimeoutException as e:
+        raise LLMTimeoutError(str(e) or "timed out") from e
+    except httpx.TransportError as e:
+        raise LLMConnectionError(str(e) or "connection failed") from e
+    _check_status(r)
+    return r.json()
+
+
+# Cloud providers get transient errors retried. The local LLM does not: a refused connection to
+# localhost should fail over at once, not after two backoff waits.
+_post_json = retry(
+    stop=stop_after_attempt(3),
+    wait=_retry_wait,
+    retry=retry_if_exception(_is_transient),
+    reraise=True,
+)(_send_json)
+
+
+def _chat_payload(model: str, history: list) -> dict:
+    return {
+        "model": model,
+        "messages": history,
+        "max_tokens": 500,
+        "temperature": 0.7,
+    }
+
+
+def _chat_completion(
+    url: str,
+    api_key: str,
+    model: str,
+    history: list,
+    timeout=httpx.USE_CLIENT_DEFAULT,
+    retried: bool = True,
+) -> str:
+    """POST to an OpenAI-compatible /chat/completions endpoint and return the reply text."""
+    post = _post_json if retried else _send_json
+    data = post(url, {"Authorization": f"Bearer {api_key}"}, _chat_payload(model, history), timeout)
+    return data["choices"][0]["message"]["content"]
+
+
+def _iter_sse_data(r: httpx.Response) -> Iterator[dict]:
+    """Decoded JSON of each `data:` line in a Server-Sent Events response (stops at [DONE])."""
+    for line in r.iter_lines():
+        if not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return
+        if data:
+            yield orjson.loads(data)
+
+
+def _stream_chat_completion(
+    url: str, api_key: str, model: str, history: list, timeout=httpx.USE_CLIENT_DEFAULT
+) -> Iterator[str]:
+    """Streaming /chat/completions (stream=true): yields content deltas as they arrive."""
+    payload = {**_chat_payload(model, history), "stream": True}
+    with _http_client().stream(
+        "POST", url, headers={"Authorization": f"Bearer {api_key}"}, json=payload, timeout=timeout
+    ) as r:
+        _check_status(r)
+        for event in _iter_sse_data(r):
+            choices = event.get("choices") or []
+            delta = choices[0].get("delta", {}).get("content") if choices else None
+            if delta:
+                yield delta
+
+
+def _gemini_payload(history: list, contents: list | None = None) -> dict:
+    """
+    generateContent body: the leading system messages (system prompt, then the rolling summary if
+    any) as systemInstruction, turns as user/model contents. `contents` is the session's
+    pre-converted turn list; built from history if not given.
+    """
+    lead = 0
+    while lead < len(history) and history[lead].get("role") == "system":
+        lead += 1
+    system_text = "\n\n".join(m["content"] for m in history[:lead]) or SYSTEM_PROMPT
+    if contents is None:
+        contents = [_gemini_content(m) for m in history[lead:]]
+    return {
+        "systemInstruction": {"parts": [{"text": system_text}]},
+        "contents": contents,
+    }
+
+
+def _gemini_text(data: dict) -> str:
+    parts = data["candidates"][0]["content"]["parts"]
+    return "".join(p.get("text", "") for p in parts)
+
 
-    if session_id not in conversations:
-        conversations[session_id] = [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {
-                "role": "assistant",
-                "content": "Hello. I'm here to listen and support you. You can share how you're feeling—whether it's stress, anxiety, sadness, or anything else. How are you doing today?",
-            },
-        ]
-
-    history = conversations[session_id]
-    history.append({"role": "user", "content": user_message})
-
-    # RAG + optional emotion / face / pattern context
-    history_for_llm = _history_with_rag(history, emotion_instruction)
-
-    result = (None, "")
-    # 1. Local LLM (Ollama, LM Studio, or any OpenAI-compatible API)
-    if local_url:
-        result = _get_local_llm_response(history_for_llm, local_url)
-    # 2. Gemini (free)
-    if result[0] is None and gemini_key:
-        result = _get_gemini_response(history_for_llm, gemini_key)
-    # 3. Groq (free)
-    if result[0] is None and groq_key:
-        result = _get_groq_response(history_for_llm, groq_key)
-    # 4. OpenAI (paid)
-    if result[0] is None and openai_key:
-        result = _get_openai_response(history_for_llm, openai_key)
-
-    if result and result[0] is not None:
-        assistant_message = result[0]
-        history.append({"role": "assistant", "content": assistant_message})
-        if len(history) > 21:
-            conversations[session_id] = [history[0]] + history[-20:]
-        return (assistant_message, False)
-
-    # All AI failed—use context-aware fallback
-    recent = _get_recent_user_messages(history)
-    return (get_fallback_response(user_message, recent), False)
+def _local_llm_chat_url(base_url: str) -> str:
+    # Normalize URL: ensure /v1 for chat completions
+    url = base_url.rstrip("/")
+    if not url.endswith("/v1"):
+        url = f"{url}/v1"
+    return f"{url}/chat/completions"
+
+
+def _stream_local_llm_response(history: list, base_url: str) -> Iterator[str]:
+    yield from _stream_chat_completion(
+        _local_llm_chat_url(base_url), LOCAL_LLM_API_KEY, LOCAL_LLM_MODEL, history
+    )
+
+
+def _stream_gemini_response(
+    history: list,
+    api_key: str,
+    contents: list | None = None,
+) -> Iterator[str]:
+    with _http_client().stream(
+        "POST",
+        GEMINI_STREAM_URL.format(model=GEMINI_MODEL),
+        headers={"x-goog-api-key": api_key},
+        json=_gemini_payload(history, contents),
+        timeout=_PROVIDER_TIMEOUTS["gemini"],
+    ) as r:
+        _check_status(r)
+        for event in _iter_sse_data(r):
+            text = _gemini_text(event)
+            if text:
+                yield text
+
+
+def _stream_groq_response(history: list, api_key: str) -> Iterator[str]:
+    yield from _stream_chat_completion(GROQ_CHAT_URL, api_key, GROQ_MODEL, history, _PROVIDER_TIMEOUTS["groq"])
+
+
+def _stream_openai_response(history: list, api_key: str) -> Iterator[str]:
+    yield from _stream_chat_completion(
+        OPENAI_CHAT_URL, api_key, OPENAI_MODEL, history, _PROVIDER_TIMEOUTS["openai"]
+    )
+
+
+def _hedge_delay(provider: str) -> float:
+    """Wait before hedging: the provider's recent p90 latency, capped at LLM_HEDGE_DELAY."""
+    samples = sorted(_provider_latency[provider])
+    if len(samples) < 5:
+        return HEDGE_DELAY_SECS
+    return min(HEDGE_DELAY_SECS, samples[int(len(samples) * 0.9)])
+
+
+def _timed_call(provider: str, fn, args: tuple) -> tuple[str | None, str]:
+    start = time.monotonic()
+    result = fn(*args)
+    _record_outcome(provider, result[0] is not None)
+    if result[0] is not None:
+        _provider_latency[provider].append(time.monotonic() - start)
+    return result
+
+
+def _first_successful_response(providers: list[tuple]) -> tuple[str | None, str]:
+    """
+    Hedged fallback over (name, fn, args) in priority order. The next provider starts when the
+    previous one fails or is slower than its hedge delay; the first non-None reply is returned.
+    Gives up once LLM_RESPONSE_DEADLINE has passed.
+    """
+    queue = list(providers)
+    pending: dict = {}
+    result: tuple[str | None, str] = (None, "")
+    deadline = time.monotonic() + RESPONSE_DEADLINE_SECS
+
+    def launch() -> str:
+        name, fn, args = queue.pop(0)
+        pending[_PROVIDER_POOL.submit(_timed_call, name, fn, args)] = name
+        return name
+
+    newest = launch()
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        timeout = min(_hedge_delay(newest), remaining) if queue else remaining
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            if queue:
+                newest = launch()
+            continue
+        for fut in done:
+            del pending[fut]
+            result = fut.result()
+            if result[0] is not None:
+                # Late replies from slower providers are simply discarded
+                for other in pending:
+                    other.cancel()
+                return result
+            if queue:
+                newest = launch()
+    for other in pending:
+        other.cancel()
+    return result
 
 
 def _get_local_llm_response(history: list, base_url: str) -> tuple[str | None, str]:
     """Use locally deployed LLM (Ollama, LM Studio, LocalAI, etc.) via OpenAI-compatible API."""
     try:
-        from openai import OpenAI
-
-        # Normalize URL: ensure /v1 for chat completions
-        url = base_url.rstrip("/")
-        if not url.endswith("/v1"):
-            url = f"{url}/v1"
-        model = os.environ.get("LOCAL_LLM_MODEL", "llama3.2")
-        client = OpenAI(base_url=url, api_key=os.environ.get("LOCAL_LLM_API_KEY", "ollama"))
-        response = client.chat.completions.create(
-            model=model,
-            messages=history,
-            max_tokens=500,
-            temperature=0.7,
+        reply = _chat_completion(
+            _local_llm_chat_url(base_url), LOCAL_LLM_API_KEY, LOCAL_LLM_MODEL, history, retried=False
         )
-        return (response.choices[0].message.content, "")
-    except Exception as e:
-        err = str(e).lower()
-        if "connection" in err or "refused" in err or "timeout" in err:
-            return (None, "Local LLM is not reachable. Is Ollama/LM Studio running?")
-        if "model" in err or "not found" in err:
+        return (reply, "")
+    except (LLMConnectionError, LLMTimeoutError):
+        return (None, "Local LLM is not reachable. Is Ollama/LM Studio running?")
+    except LLMError as e:
+        if e.status_code == 404:
             return (None, "Model not found. Check LOCAL_LLM_MODEL.")
-        return (None, str(e)[:100])
+        return (None, f"Local LLM returned HTTP {e.status_code}.")
+    except Exception:
+        return (None, "Local LLM sent a response that could not be read.")
 
 
-def _get_gemini_response(history: list, api_key: str) -> tuple[str | None, str]:
+def _get_gemini_response(
+    history: list,
+    api_key: str,
+    contents: list | None = None,
+) -> tuple[str | None, str]:
     """Use Google Gemini (free). Returns (response, error_msg)."""
     try:
-        import google.generativeai as genai
-
-        genai.configure(api_key=api_key)
-        # Use same RAG-augmented system as OpenAI path (history[0] already augmented)
-        system_text = history[0]["content"] if history and history[0].get("role") == "system" else SYSTEM_PROMPT
-        model = genai.GenerativeModel(
-            model_name=os.environ.get("GEMINI_MODEL", "gemini-1.5-flash"),
-            system_instruction=system_text,
+        data = _post_json(
+            GEMINI_GENERATE_URL.format(model=GEMINI_MODEL),
+            {"x-goog-api-key": api_key},
+            _gemini_payload(history, contents),
+            _PROVIDER_TIMEOUTS["gemini"],
         )
-
-        # Build chat with history (skip system message)
-        gemini_history = []
-        for msg in history[1:-1]:  # skip system, skip last (current user)
-            role = "user" if msg["role"] == "user" else "model"
-            gemini_history.append({"role": role, "parts": [msg["content"]]})
-
-        chat = model.start_chat(history=gemini_history)
-        response = chat.send_message(history[-1]["content"])
-        return (response.text, "")
-    except Exception as e:
-        err = str(e).lower()
-        if "api_key" in err or "invalid" in err:
-            return (None, "Invalid Gemini API key. Check GEMINI_API_KEY.")
-        if "quota" in err or "rate" in err:
-            return (None, "Gemini limit reached. Try again in a moment.")
+        return (_gemini_text(data), "")
+    except LLMTimeoutError:
+        return (None, "Gemini timed out.")
+    except LLMAuthError:
+        return (None, "Invalid Gemini API key. Check GEMINI_API_KEY.")
+    except LLMRateLimitError:
+        return (None, "Gemini limit reached. Try again in a moment.")
+    except Exception:
         return (None, "Sorry, I couldn't process that. Please try again.")
 
 
 def _get_groq_response(history: list, api_key: str) -> tuple[str | None, str]:
     """Use Groq (free tier). Returns (response, error_msg)."""
     try:
-        from groq import Groq
-
-        client = Groq(api_key=api_key)
-        response = client.chat.completions.create(
-            model=os.environ.get("GROQ_MODEL", "llama-3.3-70b-versatile"),
-            messages=history,
-            max_tokens=500,
-            temperature=0.7,
-        )
-        return (response.choices[0].message.content, "")
-    except Exception as e:
-        err = str(e).lower()
-        if "api_key" in err or "invalid" in err or "auth" in err:
-            return (None, "Invalid Groq API key.")
-        if "rate" in err or "quota" in err:
-            return (None, "")
+        return (_chat_completion(GROQ_CHAT_URL, api_key, GROQ_MODEL, history, _PROVIDER_TIMEOUTS["groq"]), "")
+    except LLMTimeoutError:
+        return (None, "Groq timed out.")
+    except LLMAuthError:
+        return (None, "Invalid Groq API key.")
+    except Exception:
         return (None, "")
 
 
 def _get_openai_response(history: list, api_key: str) -> tuple[str | None, str]:
     """Use OpenAI. Returns (response, error_msg)."""
     try:
-        from openai import OpenAI
-
-        client = OpenAI(api_key=api_key)
-        response = client.chat.completions.create(
-            model=os.environ.get("OPENAI_MODEL", "gpt-4o-mini"),
-            messages=history,
-            max_tokens=500,
-            temperature=0.7,
-        )
-        return (response.choices[0].message.content, "")
-    except Exception as e:
-        err = str(e).lower()
-        if "api_key" in err or "authentication" in err:
-            return (None, "Invalid OpenAI API key. Check OPENAI_API_KEY.")
-        if "rate" in err or "quota" in err:
-            return (None, "OpenAI limit reached. Try again in a moment.")
+        reply = _chat_completion(OPENAI_CHAT_URL, api_key, OPENAI_MODEL, history, _PROVIDER_TIMEOUTS["openai"])
+        return (reply, "")
+    except LLMTimeoutError:
+        return (None, "OpenAI timed out.")
+    except LLMAuthError:
+        return (None, "Invalid OpenAI API key. Check OPENAI_API_KEY.")
+    except LLMRateLimitError:
+        return (None, "OpenAI limit reached. Try again in a moment.")
+    except Exception:
         return (None, "Sorry, I couldn't process that. Please try again.")
 
 
+LLM_SUMMARIES_ENABLED = os.environ.get("LLM_SUMMARIES", "true").lower() not in ("0", "false", "no")
+
+
+def _condense_with_llm(text: str) -> str | None:
+    """One summarisation call, trying configured providers in the usual order (no hedging)."""
+    history = [{"role": "system", "content": _CONDENSE_PROMPT}, {"role": "user", "content": text}]
+    calls = _cloud_calls(history)
+    if LOCAL_LLM_URL:
+        calls.insert(0, ("local", _get_local_llm_response, (history, LOCAL_LLM_URL)))
+    for _, fn, args in calls:
+        reply = fn(*args)[0]
+        if reply and reply.strip():
+            return " ".join(reply.split())
+    return None
+
+
+def _condense_summary(sess: dict, text: str) -> None:
+    """
+    Background job: replace the heuristic summary `text` with an LLM-condensed one, off the
+    request path. Parts folded in while the call ran are kept after it; if the summary was
+    trimmed in the meantime the result is stale and dropped.
+    """
+    try:
+        condensed = _condense_with_llm(text)
+        with sess["lock"]:
+            current = sess["summary"]["content"][len(_SUMMARY_PREFIX):]
+            if condensed and current.startswith(text):
+                _set_summary(sess, condensed + current[len(text):])
+    finally:
+        sess["condensing"] = False
+
+
+# Hosts to pre-connect to at startup: one per configured cloud provider
+_WARM_UP_HOSTS = [
+    url
+    for key, url in (
+        (GEMINI_API_KEY, "https://generativelanguage.googleapis.com/"),
+        (GROQ_API_KEY, "https://api.groq.com/"),
+        (OPENAI_API_KEY, "https://api.openai.com/"),
+    )
+    if key
+]
+
+
+def warm_up() -> None:
+    """
+    Pay one-off startup costs before the first user does: load the text-emotion model (when
+    enabled) and open pooled TLS connections to each configured cloud provider. Never raises.
+    """
+    try:
+        classify_text_emotion("warm up")
+    except Exception:
+        pass
+    client = _http_client()
+    for url in _WARM_UP_HOSTS:
+        try:
+            client.get(url, timeout=5.0)
+        except httpx.HTTPError:
+            pass
+
+
 @app.route("/health")
 def health():
     return "OK", 200
@@ -814,32 +1745,25 @@ def index():
     return render_template("index.html")
 
 
-@app.route("/chat", methods=["POST"])
-def chat():
+def _read_chat_request() -> tuple[str, str, dict | None]:
+    """(message, session_id, face emotion or None) from a JSON or multipart chat request."""
     face_em: dict | None = None
     ct = (request.content_type or "").lower()
     if "multipart/form-data" in ct:
         message = (request.form.get("message") or "").strip()
-        session_id = request.form.get("session_id") or str(uuid.uuid4())
+        session_id = request.form.get("session_id") or secrets.token_urlsafe(16)
         up = request.files.get("face_image")
         if up and up.filename:
             face_em = classify_face_image(up.stream)
     else:
         data = request.get_json() or {}
         message = (data.get("message") or "").strip()
-        session_id = data.get("session_id") or str(uuid.uuid4())
+        session_id = data.get("session_id") or secrets.token_urlsafe(16)
+    return message, session_id, face_em
 
-    if not message:
-        return jsonify({
-            "response": "Please type a message.",
-            "is_crisis": False,
-            "session_id": session_id,
-            "emotion": None,
-            "face_emotion": None,
-            "coping_suggestions": [],
-            "mood_pattern_note": None,
-        })
 
+def _emotion_context(message: str, session_id: str, face_em: dict | None) -> tuple[dict, str, dict]:
+    """(text emotion, system-prompt emotion instruction, response meta fields) for this message."""
     text_em = classify_text_emotion(message)
     pattern_note = detect_mood_pattern(session_id) if _mood_tracking_enabled() else None
     coping = merge_face_and_text_suggestions(
@@ -849,46 +1773,138 @@ def chat():
     )
     emotion_instruction = build_emotion_instruction(text_em, face_em, pattern_note, coping)
     meta = _emotion_meta(text_em, face_em, coping, pattern_note)
+    return text_em, emotion_instruction, meta
+
+
+def _record_chat_event(
+    session_id: str,
+    message: str,
+    text_em: dict,
+    face_em: dict | None,
+    is_crisis: bool,
+) -> None:
+    if not _mood_tracking_enabled():
+        return
+    record_event(
+        session_id,
+        text_emotion_label=str(text_em.get("label", "unknown")),
+        text_confidence=float(text_em.get("confidence", 0)),
+        text_backend=str(text_em.get("backend", "")),
+        face_emotion_label=face_em.get("label") if face_em else None,
+        face_confidence=float(face_em["confidence"]) if face_em else None,
+        message_preview=message,
+        is_crisis=is_crisis,
+    )
+
+
+def _empty_message_json(session_id: str) -> bytes:
+    return _EMPTY_MESSAGE_JSON.replace(b'"__SESSION_ID__"', orjson.dumps(session_id))
+
+
+def _crisis_json(session_id: str, meta: dict) -> bytes:
+    # Splice the pre-encoded crisis text in front of the per-request fields
+    return _CRISIS_JSON_PREFIX + orjson.dumps({"session_id": session_id, **meta})[1:]
+
+
+def _sse_event(body: bytes) -> bytes:
+    return b"data: " + body + b"\n\n"
+
+
+def _sse_deltas(
+    chunks: Generator[str, None, str | None], parts: list[str]
+) -> Generator[bytes, None, str | None]:
+    """
+    `{"delta": ...}` events for each reply chunk (also collected into parts); returns chunks' return
+    value. Closes chunks on the way out so a client disconnect releases its session lock and stream.
+    """
+    try:
+        while True:
+            try:
+                chunk = next(chunks)
+            except StopIteration as done:
+                return done.value
+            parts.append(chunk)
+            yield _sse_event(orjson.dumps({"delta": chunk}))
+    finally:
+        chunks.close()
+
+
+def _sse_response(events) -> Response:
+    return Response(
+        events,
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/chat", methods=["POST"])
+def chat():
+    message, session_id, face_em = _read_chat_request()
+    if not message:
+        return _json_response(_empty_message_json(session_id))
+
+    text_em, emotion_instruction, meta = _emotion_context(message, session_id, face_em)
+
+    # Case-folded once and shared by crisis detection and the fallback rules
+    msg_lower = message.casefold()
 
     # Crisis detection - always highest priority, bypasses AI
-    if is_crisis_message(message):
-        response, is_crisis = get_crisis_response()
-        if _mood_tracking_enabled():
-            record_event(
-                session_id,
-                text_emotion_label=str(text_em.get("label", "unknown")),
-                text_confidence=float(text_em.get("confidence", 0)),
-                text_backend=str(text_em.get("backend", "")),
-                face_emotion_label=face_em.get("label") if face_em else None,
-                face_confidence=float(face_em["confidence"]) if face_em else None,
-                message_preview=message,
-                is_crisis=True,
-            )
-        return jsonify({
-            "response": response,
-            "is_crisis": is_crisis,
-            "session_id": session_id,
-            **meta,
-        })
-
-    response, is_crisis = get_ai_response(message, session_id, emotion_instruction)
-    if _mood_tracking_enabled():
-        record_event(
-            session_id,
-            text_emotion_label=str(text_em.get("label", "unknown")),
-            text_confidence=float(text_em.get("confidence", 0)),
-            text_backend=str(text_em.get("backend", "")),
-            face_emotion_label=face_em.get("label") if face_em else None,
-            face_confidence=float(face_em["confidence"]) if face_em else None,
-            message_preview=message,
-            is_crisis=False,
-        )
-    return jsonify({
+    if is_crisis_message(message, msg_lower):
+        _record_chat_event(session_id, message, text_em, face_em, is_crisis=True)
+        return _json_response(_crisis_json(session_id, meta))
+
+    response, is_crisis, duplicate = get_ai_response(message, session_id, emotion_instruction, msg_lower)
+    if not duplicate:
+        # A coalesced double-submit is the same turn: log its mood event once
+        _record_chat_event(session_id, message, text_em, face_em, is_crisis=False)
+    return _json_response(orjson.dumps({
         "response": response,
         "is_crisis": is_crisis,
         "session_id": session_id,
         **meta,
-    })
+    }))
+
+
+@app.route("/chat/stream", methods=["POST"])
+def chat_stream():
+    """
+    Same request as /chat, answered as Server-Sent Events: `{"delta": ...}` chunks while the reply
+    is generated, then one final event carrying the full /chat JSON payload (no "delta" key).
+    """
+    message, session_id, face_em = _read_chat_request()
+    if not message:
+        return _sse_response([_sse_event(_empty_message_json(session_id))])
+
+    text_em, emotion_instruction, meta = _emotion_context(message, session_id, face_em)
+    msg_lower = message.casefold()
+
+    if is_crisis_message(message, msg_lower):
+        _record_chat_event(session_id, message, text_em, face_em, is_crisis=True)
+        return _sse_response([_sse_event(_crisis_json(session_id, meta))])
+
+    def events() -> Iterator[bytes]:
+        parts: list[str] = []
+        duplicate = None
+        try:
+            duplicate = yield from _sse_deltas(
+                stream_ai_response(message, session_id, emotion_instruction, msg_lower), parts
+            )
+        finally:
+            # Logged once the turn is known not to be a coalesced double-submit (also if the
+            # client disconnects mid-stream)
+            if duplicate is None:
+                _record_chat_event(session_id, message, text_em, face_em, is_crisis=False)
+        if duplicate is not None:
+            parts.append(duplicate)
+            yield _sse_event(orjson.dumps({"delta": duplicate}))
+        yield _sse_event(orjson.dumps({
+            "response": "".join(parts),
+            "is_crisis": False,
+            "session_id": session_id,
+            **meta,
+        }))
+
+    return _sse_response(events())
 
 
 @app.route("/dashboard")
@@ -903,8 +1919,85 @@ def api_analytics_summary():
     return jsonify(analytics_summary())
 
 
+_BATCH_ID_RE = re.compile(r"batch_[A-Za-z0-9]+")
+# Shared admin secret for the batch routes, sent as "Authorization: Bearer <token>". They spend
+# OpenAI credit in bulk, so they stay off without one even if BATCH_API_ENABLED=true.
+BATCH_API_TOKEN = os.environ.get("BATCH_API_TOKEN", "").strip()
+BATCH_API_ENABLED = os.environ.get("BATCH_API_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+def _batch_api_key() -> str | None:
+    """OPENAI_API_KEY when the batch routes are switched on (BATCH_API_ENABLED=true plus a token)."""
+    if not BATCH_API_ENABLED or not BATCH_API_TOKEN:
+        return None
+    return OPENAI_API_KEY
+
+
+def _batch_authorized() -> bool:
+    auth = request.headers.get("Authorization", "")
+    scheme, _, token = auth.partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(
+        token.strip().encode(), BATCH_API_TOKEN.encode()
+    )
+
+
+@app.route("/chat/batch_submit", methods=["POST"])
+def chat_batch_submit():
+    """
+    Queue many prompts at once through the OpenAI Batch API (eval runs, not live chat). Prompts
+    that trip crisis detection are never sent; their indices come back as "crisis" with the
+    crisis reply, as /chat would give.
+    """
+    api_key = _batch_api_key()
+    if not api_key:
+        return jsonify({"error": "Batch API disabled"}), 403
+    if not _batch_authorized():
+        return jsonify({"error": "Unauthorized"}), 401
+    prompts = (request.get_json(silent=True) or {}).get("prompts")
+    if (
+        not isinstance(prompts, list)
+        or not 0 < len(prompts) <= MAX_BATCH_PROMPTS
+        or not all(isinstance(p, str) and p.strip() for p in prompts)
+    ):
+        return jsonify({"error": f"prompts must be a list of 1-{MAX_BATCH_PROMPTS} non-empty strings"}), 400
+    held: list[str | None] = [p.strip() for p in prompts]
+    crisis = [i for i, p in enumerate(held) if is_crisis_message(p)]
+    for i in crisis:
+        held[i] = None
+    batch = {"id": None, "status": "not_sent"}  # every prompt was a crisis message
+    if len(crisis) < len(held):
+        try:
+            batch = submit_batch(held, api_key, SYSTEM_PROMPT, OPENAI_MODEL)
+        except httpx.HTTPError:
+            return jsonify({"error": "Could not submit batch"}), 502
+    return jsonify({**batch, "crisis": crisis, "crisis_response": CRISIS_RESPONSE_TEXT}), 202
+
+
+@app.route("/chat/batch_result/<batch_id>")
+def chat_batch_result(batch_id: str):
+    """Batch status, plus replies in prompt order once it has completed."""
+    api_key = _batch_api_key()
+    if not api_key:
+        return jsonify({"error": "Batch API disabled"}), 403
+    if not _batch_authorized():
+        return jsonify({"error": "Unauthorized"}), 401
+    if not _BATCH_ID_RE.fullmatch(batch_id):
+        return jsonify({"error": "Unknown batch id"}), 404
+    try:
+        return jsonify(batch_result(batch_id, api_key))
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 404:
+            return jsonify({"error": "Unknown batch id"}), 404
+        return jsonify({"error": "Could not fetch batch"}), 502
+    except httpx.HTTPError:
+        return jsonify({"error": "Could not fetch batch"}), 502
+
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8080))
     print(f"\n  Mental Health Chatbot running at: http://127.0.0.1:{port}")
     print(f"  Open this link in your browser.\n")
-    app.run(debug=True, host="127.0.0.1", port=port)
+    # Development server only; production runs under gunicorn (see gunicorn_config.py)
+    debug = os.environ.get("FLASK_DEBUG", "true").lower() not in ("0", "false", "no")
+    threading.Thread(target=warm_up, daemon=True).start()
+    app.run(debug=debug, host="127.0.0.1", port=port, threaded=True)
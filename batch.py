@@ -0,0 +1,108 @@
+"""
+Bulk, non-interactive chat completions through the OpenAI Batch API.
+
+For eval runs, seed data and admin replays—never live chat: results arrive within 24h, at half
+the token price and under a separate rate limit. Prompts are sent with the same system prompt
+and sampling settings as /chat, one request per prompt.
+
+Used by /chat/batch_submit and /chat/batch_result/<id> when BATCH_API_ENABLED=true and a
+BATCH_API_TOKEN is set.
+"""
+
+from __future__ import annotations
+
+import httpx
+import orjson
+
+_API_BASE = "https://api.openai.com/v1"
+_ENDPOINT = "/v1/chat/completions"
+MAX_BATCH_PROMPTS = 50_000  # OpenAI's per-batch request limit
+
+
+def build_batch_file(prompts: list[str | None], system_prompt: str, model: str) -> bytes:
+    """
+    JSONL input file: one chat-completions request per prompt, custom_id = its index. None
+    entries (prompts held back by the caller, e.g. crisis messages) are skipped but keep their
+    index, so results still line up with the original list.
+    """
+    lines = []
+    for i, prompt in enumerate(prompts):
+        if prompt is None:
+            continue
+        lines.append(
+            orjson.dumps(
+                {
+                    "custom_id": str(i),
+                    "method": "POST",
+                    "url": _ENDPOINT,
+                    "body": {
+                        "model": model,
+                        "messages": [
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": prompt},
+                        ],
+                        "max_tokens": 500,
+                        "temperature": 0.7,
+                    },
+                }
+            )
+        )
+    return b"\n".join(lines) + b"\n"
+
+
+def submit_batch(prompts: list[str | None], api_key: str, system_prompt: str, model: str) -> dict:
+    """Upload the prompts and start a batch. Returns {"id", "status"}; raises httpx errors."""
+    headers = {"Authorization": f"Bearer {api_key}"}
+    with httpx.Client(base_url=_API_BASE, headers=headers, timeout=60.0) as client:
+        upload = client.post(
+            "/files",
+            data={"purpose": "batch"},
+            files={"file": ("batch.jsonl", build_batch_file(prompts, system_prompt, model), "application/jsonl")},
+        )
+        upload.raise_for_status()
+        r = client.post(
+            "/batches",
+            json={
+                "input_file_id": upload.json()["id"],
+                "endpoint": _ENDPOINT,
+                "completion_window": "24h",
+                "metadata": {"prompts": str(len(prompts))},
+            },
+        )
+        r.raise_for_status()
+        batch = r.json()
+    return {"id": batch["id"], "status": batch["status"]}
+
+
+def batch_result(batch_id: str, api_key: str) -> dict:
+    """
+    Batch status; once completed, also "results": replies in prompt order (None where that
+    request failed or the prompt was held back at submit).
+    """
+    headers = {"Authorization": f"Bearer {api_key}"}
+    with httpx.Client(base_url=_API_BASE, headers=headers, timeout=60.0) as client:
+        r = client.get(f"/batches/{batch_id}")
+        r.raise_for_status()
+        batch = r.json()
+        out = {"id": batch["id"], "status": batch["status"], "counts": batch.get("request_counts")}
+        if batch["status"] != "completed" or not batch.get("output_file_id"):
+            return out
+        content = client.get(f"/files/{batch['output_file_id']}/content")
+        content.raise_for_status()
+
+    # metadata["prompts"] counts held-back prompts too; request_counts only what was sent.
+    total = int((batch.get("metadata") or {}).get("prompts") or 0) or (
+        (batch.get("request_counts") or {}).get("total") or 0
+    )
+    results: list[str | None] = [None] * total
+    for line in content.content.splitlines():
+        if not line.strip():
+            continue
+        item = orjson.loads(line)
+        i = int(item["custom_id"])
+        body = (item.get("response") or {}).get("body") or {}
+        choices = body.get("choices") or []
+        if choices and i < total:
+            results[i] = choices[0]["message"]["content"]
+    out["results"] = results
+    return out
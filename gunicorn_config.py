@@ -3,8 +3,33 @@ import os
 
 # Render sets PORT (default 10000). Must bind to 0.0.0.0 for Render to detect.
 bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
-workers = 1
-threads = 2
+# LLM calls are network-bound, so concurrency comes from threads rather than processes:
+# a thread parked on a provider round-trip costs almost no CPU. Keep workers low on small
+# instances (each worker loads its own copy of the app and any ML models).
+workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+# GUNICORN_WORKER_CLASS=gevent swaps threads for greenlets (install requirements-gevent.txt first).
+# gunicorn monkey-patches the stdlib before loading the app, so app.py needs no patch_all. Only
+# worth it with USE_TRANSFORMERS_EMOTION and USE_FACE_EMOTION off: model inference is CPU-bound and
+# would stall every greenlet in the worker.
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.environ.get("GUNICORN_THREADS", "16"))
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", "1000"))
+# Import app.py once in the master so workers share its prompt, keyword and reply tables
+# copy-on-write and fork without re-importing. Not under gevent: the app's locks and pools must
+# be created after the worker has monkey-patched threading.
+preload_app = worker_class != "gevent"
 timeout = 300
 worker_timeout = 300
-keepalive = 5
+graceful_timeout = 30
+# Longer than the idle timeout of the load balancer in front (Render/Railway ~60s), so gunicorn
+# never closes a kept-alive connection the proxy is about to reuse (502 on the next request).
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", "75"))
+
+
+def post_worker_init(worker):
+    """Warm each worker (emotion model, provider connections) in the background."""
+    import threading
+
+    from app import warm_up
+
+    threading.Thread(target=warm_up, daemon=True).start()
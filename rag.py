@@ -73,14 +73,21 @@ def retrieve_rag_context(user_message: str, top_k: int = 3) -> str:
     return "\n\n".join(parts)
 
 
-def augment_system_prompt(base_prompt: str, user_message: str) -> str:
-    """Append retrieved knowledge to system prompt for this turn."""
+def rag_context(user_message: str) -> str:
+    """Retrieved knowledge for this message with its grounding instruction, or empty if none matched."""
     rag = retrieve_rag_context(user_message)
     if not rag:
-        return base_prompt
+        return ""
     return (
-        base_prompt
-        + "\n\n---\nRetrieved reference knowledge (ground your answer in this when it matches the user's topic; "
+        "Retrieved reference knowledge (ground your answer in this when it matches the user's topic; "
         "still be conversational and never dump lists unless helpful):\n"
         + rag
     )
+
+
+def augment_system_prompt(base_prompt: str, user_message: str) -> str:
+    """Append retrieved knowledge to system prompt for this turn."""
+    context = rag_context(user_message)
+    if not context:
+        return base_prompt
+    return base_prompt + "\n\n---\n" + context
@@ -0,0 +1,105 @@
+"""
+Semantic reply cache: reuses an LLM reply when a new message is a close paraphrase of one already
+answered at the same point of a conversation ("I feel anxious" / "I'm really anxious").
+
+Optional, like the transformer emotion model: needs sentence-transformers (requirements-ml.txt)
+and SEMANTIC_CACHE_ENABLED=true. Without either, every lookup misses.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any
+
+ENABLED = os.environ.get("SEMANTIC_CACHE_ENABLED", "false").lower() in ("1", "true", "yes", "on")
+_MODEL_NAME = os.environ.get("SEMANTIC_CACHE_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+_MAX_ENTRIES = int(os.environ.get("SEMANTIC_CACHE_MAX", "2000"))
+_THRESHOLD = float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+_TTL = float(os.environ.get("RESPONSE_CACHE_TTL_SECS", "3600"))
+
+_MODEL = None
+_MODEL_FAILED = False
+_LOCK = threading.Lock()
+
+# Fixed-size arrays allocated on first store, one row per slot: unit-norm embeddings, expiry and
+# last-hit times. Parallel lists hold each slot's namespace and reply. Slots fill in order, and
+# lookups only scan the first _FILLED rows.
+_MATRIX = None
+_FILLED = 0
+_EXPIRES = None
+_USED = None
+_NAMESPACES: list[bytes | None] = []
+_REPLIES: list[str | None] = []
+
+
+def _embed(text: str) -> Any:
+    """Unit-norm float32 embedding of text, or None if the model is unavailable."""
+    global _MODEL, _MODEL_FAILED
+    if _MODEL_FAILED:
+        return None
+    try:
+        if _MODEL is None:
+            with _LOCK:
+                if _MODEL is None:
+                    from sentence_transformers import SentenceTransformer
+
+                    _MODEL = SentenceTransformer(_MODEL_NAME)
+        return _MODEL.encode([text], normalize_embeddings=True, convert_to_numpy=True)[0].astype("float32")
+    except Exception:
+        _MODEL_FAILED = True
+        return None
+
+
+def lookup(namespace: bytes, text: str) -> tuple[str | None, Any]:
+    """
+    Cached reply for a paraphrase of text under namespace, if cosine similarity reaches the
+    threshold. Returns (reply or None, embedding) so a miss can be stored without re-encoding.
+    """
+    embedding = _embed(text)
+    if embedding is None:
+        return None, None
+    import numpy as np
+
+    with _LOCK:
+        if _MATRIX is None:
+            return None, embedding
+        now = time.time()
+        sims = _MATRIX[:_FILLED] @ embedding
+        candidates = np.flatnonzero((sims >= _THRESHOLD) & (_EXPIRES[:_FILLED] > now))
+        for i in candidates[np.argsort(-sims[candidates])]:
+            if _NAMESPACES[i] == namespace:
+                _USED[i] = now
+                return _REPLIES[i], embedding
+    return None, embedding
+
+
+def store(namespace: bytes, embedding: Any, reply: str) -> None:
+    """Add a reply, reusing an expired slot or else the least recently hit one."""
+    global _MATRIX, _EXPIRES, _USED, _FILLED
+    if embedding is None:
+        return
+    import numpy as np
+
+    with _LOCK:
+        if _MATRIX is None:
+            size = _MAX_ENTRIES
+            _MATRIX = np.zeros((size, embedding.shape[0]), dtype=np.float32)
+            _EXPIRES = np.zeros(size)
+            _USED = np.zeros(size)
+            _NAMESPACES.extend([None] * size)
+            _REPLIES.extend([None] * size)
+        now = time.time()
+        if _FILLED < len(_REPLIES):
+            i = _FILLED
+            _FILLED += 1
+        else:
+            i = int(np.argmin(_EXPIRES))
+            if _EXPIRES[i] > now:
+                i = int(np.argmin(_USED))
+        _MATRIX[i] = embedding
+        _EXPIRES[i] = now + _TTL
+        _USED[i] = now
+        _NAMESPACES[i] = namespace
+        _REPLIES[i] = reply